@@ -0,0 +1,167 @@
+"""
+Бенчмарк диспетчеризации: цепочка фильтров против индекса маршрутов.
+
+Прогоняет через Dispatcher синтетический поток апдейтов (кнопки меню,
+callback-и гайдов, /start и произвольный текст) с заглушкой вместо Bot API
+и печатает стоимость одного апдейта по видам. Каждый режим запускается
+в отдельном процессе: маршрутизатор aiogram подключается к диспетчеру один раз.
+
+    python benchmarks/bench_dispatch.py [--updates 20000] [--mode both|chain|indexed]
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from statistics import mean, quantiles
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_ROOT))
+
+MENU_TEXTS = ["🔍 Бесплатный аудит", "📚 Гайды и материалы", "💬 Задать вопрос", "🌐 Визитка / сайт"]
+GUIDE_CALLBACKS = ["guides:basics", "guides:cases", "guides:automation", "guides:menu", "guides:back"]
+STREAM_WEIGHTS = {"menu": 30, "guides": 40, "start": 10, "free_text": 20}
+
+
+def isolate_storage(directory: str) -> None:
+    # Хранилища открываются при импорте обработчиков — уводим их во временный каталог.
+    for name, file_name in (
+        ("AUDIT_JSON_PATH", "audits.json"),
+        ("AUDIT_DB_PATH", "audits.db"),
+        ("USERS_DB_PATH", "users.db"),
+        ("SCHEDULER_DB_PATH", "scheduler.db"),
+        ("FOLLOW_UP_DB_PATH", "follow_ups.db"),
+        ("FSM_DB_PATH", "fsm.db"),
+        ("AUDIT_ARCHIVE_DIR", "archive"),
+    ):
+        os.environ[name] = str(Path(directory) / file_name)
+    os.environ["AUDIT_STORAGE_BACKEND"] = "sqlite"
+
+
+def _build_stream(count: int, seed: int) -> List[Tuple[str, Dict[str, Any]]]:
+    rng = random.Random(seed)
+    kinds = rng.choices(list(STREAM_WEIGHTS), weights=list(STREAM_WEIGHTS.values()), k=count)
+    stream = []
+    for update_id, kind in enumerate(kinds, start=1):
+        user = {"id": 10_000 + update_id, "is_bot": False, "first_name": "Bench"}
+        message = {
+            "message_id": update_id,
+            "date": int(datetime.now().timestamp()),
+            "chat": {"id": user["id"], "type": "private"},
+            "from": user,
+        }
+        if kind == "guides":
+            message["text"] = "Гайды"
+            payload = {
+                "update_id": update_id,
+                "callback_query": {
+                    "id": str(update_id),
+                    "from": user,
+                    "chat_instance": "bench",
+                    "data": rng.choice(GUIDE_CALLBACKS),
+                    "message": message,
+                },
+            }
+        else:
+            message["text"] = {
+                "menu": lambda: rng.choice(MENU_TEXTS),
+                "start": lambda: "/start",
+                "free_text": lambda: f"просто сообщение {update_id}",
+            }[kind]()
+            payload = {"update_id": update_id, "message": message}
+        stream.append((kind, payload))
+    return stream
+
+
+async def _run(mode: str, count: int, seed: int) -> Dict[str, List[float]]:
+    from aiogram import Bot, Dispatcher
+    from aiogram.client.session.base import BaseSession
+    from aiogram.fsm.storage.memory import MemoryStorage
+    from aiogram.types import Update
+
+    from handlers.admin import router as admin_router
+    from handlers.audit import router as audit_router
+    from handlers.contact import router as contact_router
+    from handlers.guides import router as guides_router
+    from handlers.site import router as site_router
+    from handlers.start import router as start_router
+    from utils.routing import setup_route_index
+
+    class StubSession(BaseSession):
+        """Отвечает на любой метод Bot API успехом, не выходя в сеть."""
+
+        async def make_request(self, bot: Bot, method: Any, timeout: Optional[int] = None) -> Any:
+            return True
+
+        async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                                 chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+            yield b""
+
+        async def close(self) -> None:
+            return None
+
+    bot = Bot(token="123456:" + "A" * 35, session=StubSession())
+    dp = Dispatcher(storage=MemoryStorage())
+    for router in (start_router, admin_router, audit_router, guides_router, contact_router, site_router):
+        dp.include_router(router)
+    if mode == "indexed":
+        setup_route_index(dp, exclude=(admin_router,))
+
+    stream = [(kind, Update.model_validate(payload, context={"bot": bot})) for kind, payload in _build_stream(count, seed)]
+    # Прогрев: ленивые импорты и первые подключения к SQLite не должны попадать в замер.
+    for _, update in stream[:200]:
+        await dp.feed_update(bot, update)
+
+    timings: Dict[str, List[float]] = defaultdict(list)
+    for kind, update in stream[200:]:
+        started = time.perf_counter()
+        await dp.feed_update(bot, update)
+        timings[kind].append(time.perf_counter() - started)
+    return timings
+
+
+def _report(mode: str, timings: Dict[str, List[float]]) -> None:
+    total = [value for values in timings.values() for value in values]
+    print(f"[{mode}] {len(total)} updates, {len(total) / sum(total):,.0f} updates/sec")
+    print(f"  {'kind':<10}{'mean µs':>10}{'p50 µs':>10}{'p95 µs':>10}")
+    for kind in [*STREAM_WEIGHTS, "all"]:
+        values = total if kind == "all" else timings.get(kind, [])
+        if len(values) < 2:
+            continue
+        cuts = quantiles(values, n=100)
+        print(f"  {kind:<10}{mean(values) * 1e6:>10.1f}{cuts[49] * 1e6:>10.1f}{cuts[94] * 1e6:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--mode", choices=("both", "chain", "indexed"), default="both")
+    args = parser.parse_args()
+
+    if args.mode == "both":
+        for mode in ("chain", "indexed"):
+            subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--updates", str(args.updates), "--seed", str(args.seed)],
+                check=True,
+            )
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        isolate_storage(directory)
+        timings = asyncio.run(_run(args.mode, args.updates, args.seed))
+        _report(args.mode, timings)
+        from data.storage import close_user_registry
+
+        close_user_registry()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Микробенчмарк клавиатур: сборка разметки на каждый апдейт против готовой.
+
+Для каждой клавиатуры горячих путей (главное меню, контакты, меню гайдов,
+разделы гайдов) сравнивает время и объём выделенной памяти на один апдейт
+при сборке через билдер и при отдаче заранее собранного объекта.
+
+    python benchmarks/bench_keyboards.py [--iterations 20000]
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data.guides import get_guides_catalog  # noqa: E402
+from handlers import guides  # noqa: E402
+from utils import keyboard  # noqa: E402
+
+
+CASES: List[Tuple[str, Callable[[], object], Callable[[], object]]] = [
+    ("main_menu", keyboard._build_main_menu_keyboard, keyboard.main_menu_keyboard),
+    ("contact", keyboard._build_contact_keyboard, keyboard.contact_keyboard),
+    (
+        "guides_menu",
+        lambda: guides._build_guides_menu_keyboard(get_guides_catalog()),
+        guides.guides_menu_keyboard,
+    ),
+    (
+        "guides_section",
+        lambda: guides._build_section_keyboard(get_guides_catalog().sections["basics"]),
+        lambda: guides.section_keyboard("basics"),
+    ),
+]
+
+
+def _per_call_seconds(factory: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        factory()
+    return (time.perf_counter() - started) / iterations
+
+
+def _per_call_bytes(factory: Callable[[], object], iterations: int) -> float:
+    # Держим результаты живыми, чтобы считались все выделения, а не только пик.
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [factory() for _ in range(iterations)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return max(after - before, 0) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'keyboard':<16}{'build µs':>10}{'cached µs':>11}{'build B':>10}{'cached B':>10}")
+    for name, build, cached in CASES:
+        assert build() == cached(), name
+        build_time = _per_call_seconds(build, args.iterations) * 1e6
+        cached_time = _per_call_seconds(cached, args.iterations) * 1e6
+        alloc_iterations = max(args.iterations // 10, 1)
+        build_bytes = _per_call_bytes(build, alloc_iterations)
+        cached_bytes = _per_call_bytes(cached, alloc_iterations)
+        print(f"{name:<16}{build_time:>10.2f}{cached_time:>11.3f}{build_bytes:>10.0f}{cached_bytes:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
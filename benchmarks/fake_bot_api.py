@@ -0,0 +1,145 @@
+"""
+Локальная заглушка Telegram Bot API для нагрузочных прогонов.
+
+Отвечает на /bot<token>/<method> правдоподобными объектами (Message, User, True),
+считает вызовы по методам и по желанию добавляет задержку и ответы 429
+с Retry-After — чтобы проверить поведение бота под ограничениями Telegram.
+Статистика вызовов: GET /stats, сброс: POST /stats/reset.
+
+    python benchmarks/fake_bot_api.py [--port 8081] [--latency-ms 0] [--flood-rate 0.0]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from typing import Any, Dict
+
+from aiohttp import web
+
+
+_BOT_USER = {"id": 123456, "is_bot": True, "first_name": "LoadTestBot", "username": "load_test_bot"}
+# Методы, которые в ответ отдают отправленное сообщение.
+_MESSAGE_METHODS = {
+    "sendmessage",
+    "senddocument",
+    "sendphoto",
+    "editmessagetext",
+    "editmessagereplymarkup",
+    "copymessage",
+    "forwardmessage",
+}
+
+
+def _chat_id(value: Any) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        # @username канала или админа — id неизвестен, но модель Chat требует число.
+        return -1
+
+
+class FakeBotAPI:
+    def __init__(self, latency: float = 0.0, flood_rate: float = 0.0, retry_after: int = 1, seed: int = 0) -> None:
+        self._latency = latency
+        self._flood_rate = flood_rate
+        self._retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._message_ids = itertools.count(1)
+        self.calls: Counter = Counter()
+        self.floods: Counter = Counter()
+        self.started = time.monotonic()
+
+    def _message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = _chat_id(params.get("chat_id"))
+        message = {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "channel"},
+            "from": _BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        if "reply_markup" in params:
+            try:
+                markup = json.loads(params["reply_markup"])
+            except (TypeError, ValueError):
+                markup = None
+            # В ответе Telegram бывает только inline-клавиатура.
+            if isinstance(markup, dict) and "inline_keyboard" in markup:
+                message["reply_markup"] = markup
+        return message
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params: Dict[str, Any] = dict(await request.post())
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        if self._flood_rate and method.lower() != "getme" and self._rng.random() < self._flood_rate:
+            self.floods[method] += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self._retry_after}",
+                    "parameters": {"retry_after": self._retry_after},
+                },
+                status=429,
+            )
+
+        lowered = method.lower()
+        if lowered == "getme":
+            result: Any = _BOT_USER
+        elif lowered in _MESSAGE_METHODS:
+            result = self._message(params)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "calls": dict(self.calls),
+                "floods": dict(self.floods),
+                "uptime_seconds": time.monotonic() - self.started,
+            }
+        )
+
+    async def reset(self, request: web.Request) -> web.Response:
+        self.calls.clear()
+        self.floods.clear()
+        return web.json_response({"ok": True})
+
+
+def create_app(latency: float = 0.0, flood_rate: float = 0.0, retry_after: int = 1) -> web.Application:
+    api = FakeBotAPI(latency=latency, flood_rate=flood_rate, retry_after=retry_after)
+    app = web.Application()
+    app.add_routes(
+        [
+            web.post("/bot{token}/{method}", api.handle),
+            web.get("/stats", api.stats),
+            web.post("/stats/reset", api.reset),
+        ]
+    )
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="задержка каждого ответа")
+    parser.add_argument("--flood-rate", type=float, default=0.0, help="доля ответов 429 Too Many Requests")
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms / 1000, args.flood_rate, args.retry_after)
+    web.run_app(app, host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Нагрузочный прогон бота против локальной заглушки Bot API.
+
+Поднимает benchmarks/fake_bot_api.py отдельным процессом (или берёт уже запущенную
+через --api-url), направляет на неё настоящую aiohttp-сессию бота и гонит через
+Dispatcher тысячи параллельных пользователей по сценариям:
+
+    start      /start
+    audit      кнопка аудита → тип → цель → ссылка (AuditStates)
+    guides     меню гайдов → разделы → назад
+    broadcast  админ: /admin → рассылка → текст → подтверждение, и ожидание доставки
+
+Сценарии идут фазами, так что updates/sec считается для каждого отдельно.
+Хранилища уводятся во временный каталог.
+
+    python benchmarks/load_test.py [--users 2000] [--concurrency 500] [--scenarios start,audit,guides,broadcast]
+                                   [--api-latency-ms 0] [--flood-rate 0] [--api-url http://127.0.0.1:8081]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from statistics import quantiles
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.request import urlopen
+
+_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_dispatch import isolate_storage  # noqa: E402
+
+SCENARIOS = ("start", "audit", "guides", "broadcast")
+ADMIN_ID = 1
+FIRST_USER_ID = 100_000
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _start_fake_api(latency_ms: float, flood_rate: float) -> "tuple[subprocess.Popen, str]":
+    port = _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            str(Path(__file__).resolve().parent / "fake_bot_api.py"),
+            "--port", str(port),
+            "--latency-ms", str(latency_ms),
+            "--flood-rate", str(flood_rate),
+        ]
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            with urlopen(f"{url}/stats", timeout=1):
+                return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Fake Bot API did not start")
+
+
+def _api_calls(url: str) -> Dict[str, int]:
+    with urlopen(f"{url}/stats", timeout=5) as response:
+        return json.load(response)["calls"]
+
+
+class UpdateFactory:
+    """Собирает апдейты от имени пользователя: сообщения и нажатия inline-кнопок."""
+
+    def __init__(self) -> None:
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": "Load", "username": f"load_{user_id}"}
+
+    def _message(self, user_id: int, text: str) -> Dict[str, Any]:
+        message = {
+            "message_id": next(self._message_ids),
+            "date": int(datetime.now().timestamp()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+            "text": text,
+        }
+        if text.startswith("/"):
+            command = text.split()[0]
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+        return message
+
+    def message(self, user_id: int, text: str) -> Dict[str, Any]:
+        return {"update_id": next(self._update_ids), "message": self._message(user_id, text)}
+
+    def callback(self, user_id: int, data: str) -> Dict[str, Any]:
+        return {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self._user(user_id),
+                "chat_instance": "load",
+                "data": data,
+                "message": self._message(user_id, "…"),
+            },
+        }
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace, api_url: str) -> None:
+        self.args = args
+        self.api_url = api_url
+        self.rng = random.Random(args.seed)
+        self.factory = UpdateFactory()
+        self.timings: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def setup(self) -> None:
+        from aiogram import Bot, Dispatcher
+        from aiogram.client.session.aiohttp import AiohttpSession
+        from aiogram.client.telegram import TelegramAPIServer
+
+        from data.config import get_config
+        from data.fsm_storage import create_fsm_storage
+        from handlers.admin import router as admin_router
+        from handlers.audit import router as audit_router
+        from handlers.contact import router as contact_router
+        from handlers.guides import router as guides_router
+        from handlers.site import router as site_router
+        from handlers.start import router as start_router
+        from utils.routing import setup_route_index
+
+        session = AiohttpSession(api=TelegramAPIServer.from_base(self.api_url), limit=self.args.connections)
+        self.bot = Bot(token="123456:" + "A" * 35, session=session)
+        self.dp = Dispatcher(storage=create_fsm_storage(get_config()))
+        # Тот же порядок, что в main.py.
+        for router in (start_router, admin_router, audit_router, guides_router, contact_router, site_router):
+            self.dp.include_router(router)
+        setup_route_index(self.dp, exclude=(admin_router,))
+
+    async def teardown(self) -> None:
+        from data.broadcast_jobs import close_broadcast_jobs
+        from data.follow_ups import close_follow_up_queue
+        from data.local_storage import stop_audit_writer
+        from data.storage import close_user_registry
+        from utils.background import drain_background_tasks
+        from utils.notifications import stop_admin_notifier
+        from utils.scheduler import scheduler
+
+        await drain_background_tasks()
+        await stop_audit_writer()
+        await stop_admin_notifier()
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        await self.dp.storage.close()
+        await self.bot.session.close()
+        close_broadcast_jobs()
+        close_follow_up_queue()
+        close_user_registry()
+
+    async def feed(self, scenario: str, payload: Dict[str, Any]) -> None:
+        from aiogram.types import Update
+
+        update = Update.model_validate(payload, context={"bot": self.bot})
+        started = time.perf_counter()
+        try:
+            await self.dp.feed_update(self.bot, update)
+        except Exception:  # noqa: BLE001
+            self.errors[scenario] += 1
+        finally:
+            self.timings[scenario].append(time.perf_counter() - started)
+        if self.args.think_ms:
+            await asyncio.sleep(self.rng.uniform(0, self.args.think_ms) / 1000)
+
+    # --- сценарии ---------------------------------------------------------------
+
+    async def start_flow(self, user_id: int) -> None:
+        await self.feed("start", self.factory.message(user_id, "/start"))
+
+    async def audit_flow(self, user_id: int) -> None:
+        from handlers.audit import AUDIT_OPTIONS, GOAL_OPTIONS
+
+        rng = random.Random(user_id)
+        for text in (
+            "🔍 Бесплатный аудит",
+            rng.choice(AUDIT_OPTIONS),
+            rng.choice(GOAL_OPTIONS),
+            f"https://t.me/load_channel_{user_id}",
+        ):
+            await self.feed("audit", self.factory.message(user_id, text))
+
+    async def guides_flow(self, user_id: int) -> None:
+        from data.guides import get_guides_catalog
+        from handlers.guides import GUIDES_BACK, GUIDES_MENU, GUIDES_PREFIX
+
+        sections = list(get_guides_catalog().order)
+        rng = random.Random(user_id)
+        await self.feed("guides", self.factory.message(user_id, "📚 Гайды и материалы"))
+        for section in rng.sample(sections, k=min(2, len(sections))):
+            await self.feed("guides", self.factory.callback(user_id, f"{GUIDES_PREFIX}{section}"))
+            await self.feed("guides", self.factory.callback(user_id, GUIDES_BACK))
+        await self.feed("guides", self.factory.callback(user_id, GUIDES_MENU))
+
+    async def broadcast_flow(self) -> Dict[str, float]:
+        from data.broadcast_jobs import running_broadcast_jobs
+        from data.storage import flush_users
+        from handlers.admin import ADMIN_BROADCAST_CONFIRM, ADMIN_MENU_BROADCAST
+
+        await asyncio.to_thread(flush_users)
+        sent_before = _api_calls(self.api_url).get("sendMessage", 0)
+        started = time.perf_counter()
+        await self.feed("broadcast", self.factory.message(ADMIN_ID, "/admin"))
+        await self.feed("broadcast", self.factory.callback(ADMIN_ID, ADMIN_MENU_BROADCAST))
+        await self.feed("broadcast", self.factory.message(ADMIN_ID, "Нагрузочная рассылка"))
+        await self.feed("broadcast", self.factory.callback(ADMIN_ID, ADMIN_BROADCAST_CONFIRM))
+        while await asyncio.to_thread(running_broadcast_jobs):
+            await asyncio.sleep(0.2)
+        elapsed = time.perf_counter() - started
+        delivered = _api_calls(self.api_url).get("sendMessage", 0) - sent_before
+        return {"delivered": delivered, "seconds": elapsed}
+
+    async def run_users(self, flow: Callable[[int], Awaitable[None]]) -> float:
+        limit = asyncio.Semaphore(self.args.concurrency)
+
+        async def user(user_id: int) -> None:
+            async with limit:
+                await flow(user_id)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(FIRST_USER_ID + n) for n in range(self.args.users)))
+        return time.perf_counter() - started
+
+    async def run(self) -> None:
+        await self.setup()
+        try:
+            flows = {"start": self.start_flow, "audit": self.audit_flow, "guides": self.guides_flow}
+            for scenario in self.args.scenarios:
+                if scenario == "broadcast":
+                    outcome = await self.broadcast_flow()
+                    self.report(scenario, outcome["seconds"])
+                    rate = outcome["delivered"] / outcome["seconds"] if outcome["seconds"] else 0.0
+                    print(f"  delivered {outcome['delivered']:.0f} messages, {rate:,.0f} msg/sec")
+                else:
+                    wall = await self.run_users(flows[scenario])
+                    self.report(scenario, wall)
+            print(f"Bot API calls: {_api_calls(self.api_url)}")
+        finally:
+            await self.teardown()
+
+    def report(self, scenario: str, wall: float) -> None:
+        values = self.timings.get(scenario, [])
+        if not values:
+            return
+        line = f"[{scenario}] {len(values)} updates in {wall:.2f}s, {len(values) / wall:,.0f} updates/sec"
+        if self.errors.get(scenario):
+            line += f", {self.errors[scenario]} errors"
+        print(line)
+        if len(values) < 2:
+            return
+        cuts = quantiles(values, n=100)
+        print(f"  p50 {cuts[49] * 1e3:.2f} ms   p95 {cuts[94] * 1e3:.2f} ms   p99 {cuts[98] * 1e3:.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=500, help="сколько пользователей действуют одновременно")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--think-ms", type=float, default=0.0, help="пауза пользователя между шагами, до N мс")
+    parser.add_argument("--connections", type=int, default=100, help="лимит соединений aiohttp-сессии бота")
+    parser.add_argument("--api-url", help="уже запущенная заглушка Bot API; иначе поднимается своя")
+    parser.add_argument("--api-latency-ms", type=float, default=0.0)
+    parser.add_argument("--flood-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    process: Optional[subprocess.Popen] = None
+    api_url = args.api_url
+    if api_url is None:
+        process, api_url = _start_fake_api(args.api_latency_ms, args.flood_rate)
+
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            isolate_storage(directory)
+            os.environ["ADMIN_IDS"] = str(ADMIN_ID)
+            # Лимит Telegram здесь не нужен: меряем сам бот, а не ожидание токенов.
+            os.environ.setdefault("BROADCAST_RATE_PER_SECOND", "100000")
+            os.environ.setdefault("BROADCAST_CONCURRENCY", "32")
+            asyncio.run(LoadTest(args, api_url).run())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import threading
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Set, Tuple
+
+from data.audit_query import NO_FILTER, AuditFilter
+from data.audit_stats import AuditStats
+
+
+_UNKNOWN_PARTITION = "unknown"
+
+
+class _DamagedSegment(Exception):
+    """Сегмент архива обрывается на повреждённых данных."""
+
+
+def _partition(record: Mapping[str, Any]) -> str:
+    month = (record.get("timestamp") or "")[:7]
+    return month if len(month) == 7 else _UNKNOWN_PARTITION
+
+
+class AuditArchive:
+    """
+    Холодный архив разобранных заявок.
+
+    Заявки раскладываются по месяцам поступления в сегменты
+    `audits-YYYY-MM.jsonl.gz`; каждая архивация дописывает в сегмент новый
+    gzip-член, так что старые данные не переписываются и не перечитываются.
+    Выгрузка потоково читает только сегменты нужных месяцев, а агрегаты для
+    статистики хранятся рядом (`stats.json`) вместе с размерами сегментов и id
+    последней архивации — этого хватает, чтобы повторный запуск после сбоя
+    не записал заявки дважды.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self._directory = directory
+        self._stats_path = directory / "stats.json"
+        self._lock = threading.Lock()
+        self._stats: Optional[AuditStats] = None
+        # Заявки последней архивации: только они могут ещё лежать в горячем хранилище.
+        self._recent_ids: Set[str] = set()
+
+    def _segment_path(self, partition: str) -> Path:
+        return self._directory / f"audits-{partition}.jsonl.gz"
+
+    def _segments(self) -> List[Tuple[str, Path]]:
+        if not self._directory.exists():
+            return []
+        segments = []
+        for path in self._directory.glob("audits-*.jsonl.gz"):
+            partition = path.name[len("audits-"):-len(".jsonl.gz")]
+            segments.append((partition, path))
+        return sorted(segments)
+
+    @staticmethod
+    def _iter_segment(path: Path, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        """Заявки сегмента начиная с байта `offset` (границы gzip-члена); повреждённый хвост обрывает чтение."""
+        count = 0
+        try:
+            with path.open("rb") as raw:
+                raw.seek(offset)
+                with gzip.open(raw, "rt", encoding="utf-8") as segment:
+                    for line in segment:
+                        if line.strip():
+                            yield json.loads(line)
+                            count += 1
+        except FileNotFoundError:
+            return
+        except (EOFError, OSError, zlib.error, json.JSONDecodeError) as exc:
+            logging.warning("Audit archive segment %s is damaged after %s records: %s", path, count, exc)
+            raise _DamagedSegment from exc
+
+    # --- запись -------------------------------------------------------------------
+
+    def store(self, records: Iterable[Mapping[str, Any]]) -> List[str]:
+        """
+        Дописывает заявки в сегменты и возвращает id всех, что теперь лежат в архиве.
+        Заявки прошлой архивации (процесс упал до удаления их из хранилища)
+        второй раз не пишутся; сами сегменты при этом не перечитываются.
+        """
+        batch = list(records)
+        if not batch:
+            return []
+
+        with self._lock:
+            stats = self._load_stats()
+            by_partition: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+            for record in batch:
+                if str(record.get("id")) not in self._recent_ids:
+                    by_partition[_partition(record)].append(dict(record))
+            if by_partition:
+                self._directory.mkdir(parents=True, exist_ok=True)
+            for partition, fresh in by_partition.items():
+                self._append_segment(self._segment_path(partition), fresh)
+                for record in fresh:
+                    stats.add(record)
+            archived = [str(record.get("id")) for record in batch]
+            self._recent_ids = set(archived)
+            self._save_stats()
+        return archived
+
+    @staticmethod
+    def _append_segment(path: Path, records: List[Dict[str, Any]]) -> None:
+        body = "".join(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n" for record in records)
+        with path.open("ab") as segment:
+            segment.write(gzip.compress(body.encode("utf-8")))
+            segment.flush()
+            os.fsync(segment.fileno())
+
+    # --- агрегаты -----------------------------------------------------------------
+
+    def _disk_sizes(self) -> Dict[str, int]:
+        return {path.name: path.stat().st_size for _, path in self._segments()}
+
+    def _load_stats(self) -> AuditStats:
+        # Архив пишет только этот процесс: после первой загрузки сводка ведётся
+        # в памяти, и чтение не обходит сегменты на диске.
+        if self._stats is not None:
+            return self._stats
+        sizes = self._disk_sizes()
+        try:
+            data = json.loads(self._stats_path.read_text(encoding="utf-8"))
+            recorded = dict(data.get("segments") or {})
+            recent = {str(key) for key in data.get("recent_ids", [])}
+            if recorded == sizes:
+                self._stats = AuditStats.from_dict(data.get("stats", {}))
+                self._recent_ids = recent
+                return self._stats
+        except (OSError, ValueError, AttributeError, TypeError):
+            recorded, recent = None, set()
+
+        if recorded is not None:
+            # Сегменты выросли после последней сводки: процесс упал посреди архивации.
+            recent |= self._recover_tails(recorded)
+        # Сводки нет или сегменты менялись без неё — пересчитываем по архиву.
+        stats = AuditStats()
+        for _, path in self._segments():
+            try:
+                for record in self._iter_segment(path):
+                    stats.add(record)
+            except _DamagedSegment:
+                pass
+        self._stats, self._recent_ids = stats, recent
+        if self._segments():
+            self._save_stats()
+        return stats
+
+    def _recover_tails(self, recorded: Mapping[str, int]) -> Set[str]:
+        """
+        Дописанное после сводки ещё не подтверждено удалением из хранилища: целый хвост
+        запоминается как последняя архивация, оборванный — отрезается, его заявки
+        остались в хранилище и уйдут в архив в следующий раз.
+        """
+        recent: Set[str] = set()
+        for _, path in self._segments():
+            offset = int(recorded.get(path.name, 0))
+            if path.stat().st_size <= offset:
+                continue
+            try:
+                recent.update(str(record.get("id")) for record in self._iter_segment(path, offset))
+            except _DamagedSegment:
+                logging.warning("Truncating torn archive append in %s back to %s bytes.", path, offset)
+                if offset:
+                    with path.open("rb+") as segment:
+                        segment.truncate(offset)
+                        os.fsync(segment.fileno())
+                else:
+                    path.unlink()
+        return recent
+
+    def _save_stats(self) -> None:
+        payload = {
+            "segments": self._disk_sizes(),
+            "stats": self._stats.to_dict() if self._stats else {},
+            "recent_ids": sorted(self._recent_ids),
+        }
+        tmp_path = self._stats_path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, self._stats_path)
+
+    def stats(self) -> AuditStats:
+        with self._lock:
+            return self._load_stats()
+
+    # --- чтение -------------------------------------------------------------------
+
+    def scan(self, filters: AuditFilter = NO_FILTER, page_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """Заявки архива по фильтру страницами; сегменты читаются потоково, вне диапазона дат — не читаются."""
+        if filters.status not in (None, "resolved"):
+            return
+        for partition, path in self._segments():
+            if partition != _UNKNOWN_PARTITION:
+                if filters.since is not None and partition < filters.since[:7]:
+                    continue
+                if filters.until is not None and partition > filters.until[:7]:
+                    continue
+            page: List[Dict[str, Any]] = []
+            try:
+                for record in self._iter_segment(path):
+                    if filters.matches(record):
+                        page.append(record)
+                        if len(page) >= page_size:
+                            yield page
+                            page = []
+            except _DamagedSegment:
+                pass
+            if page:
+                yield page
@@ -0,0 +1,536 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from copy import deepcopy
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from data.audit_query import NO_FILTER, AuditFilter
+
+
+def _checksum(lsn: int, entries: List[Any]) -> str:
+    body = json.dumps([lsn, entries], ensure_ascii=False, separators=(",", ":"))
+    return "sha256:" + hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _fsync_dir(path: Path) -> None:
+    # Без fsync каталога переименование может не пережить отключение питания.
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _read_journal(path: Path, after_lsn: int) -> Iterator[Dict[str, Any]]:
+    """Записи журнала с lsn больше `after_lsn`; битые строки пропускаются."""
+    try:
+        journal = path.open("r", encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with journal:
+        for line in journal:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                logging.warning("Skipping malformed audit journal line in %s", path)
+                continue
+            if int(entry.get("lsn", 0)) > after_lsn:
+                yield entry
+
+
+def read_audits(snapshot_path: Path, backups: int = 3) -> List[Dict[str, Any]]:
+    """
+    Заявки JSON-хранилища только на чтение: снапшот (или самая свежая целая копия)
+    плюс журналы. В отличие от `AuditLog`, файлы не переписываются и не переносятся.
+    """
+    candidates = [snapshot_path, *(snapshot_path.with_suffix(f".json.bak{n}") for n in range(1, backups + 1))]
+    records: Dict[str, Dict[str, Any]] = {}
+    lsn = 0
+    restored = False
+    for path in candidates:
+        if not path.exists():
+            continue
+        try:
+            records, lsn, _ = AuditLog._read_snapshot(path)
+        except (OSError, ValueError) as exc:
+            logging.error("Audit snapshot %s is unreadable: %s", path, exc)
+            restored = True
+            continue
+        break
+
+    journals = [snapshot_path.with_suffix(f".log.bak{n}") for n in range(backups, 0, -1)] if restored else []
+    journals += [snapshot_path.with_suffix(".log.compacting"), snapshot_path.with_suffix(".log")]
+    for path in journals:
+        for entry in _read_journal(path, lsn):
+            key = str(entry.get("key"))
+            if entry.get("op") == "put" and isinstance(entry.get("record"), dict):
+                entry["record"].setdefault("id", key)
+                records[key] = entry["record"]
+            elif entry.get("op") == "del":
+                records.pop(key, None)
+            lsn = max(lsn, int(entry.get("lsn", 0)))
+    return list(records.values())
+
+
+class AuditLog:
+    """
+    Append-only хранилище заявок.
+
+    Состояние = снапшот (audits.json) + журнал JSON Lines (audits.log).
+    Каждая запись — одна строка в журнале, удаление — строка-надгробие,
+    поэтому сохранение стоит O(1) независимо от размера истории.
+    Когда журнал разрастается, фоновый поток сворачивает его в новый снапшот.
+
+    Снапшот пишется атомарно (временный файл, fsync, rename) и несёт контрольную
+    сумму; предыдущие версии остаются в `audits.json.bak1..N`, а свёрнутые в снапшот
+    журналы — в `audits.log.bak1..N`. Если при запуске снапшот не читается или сумма
+    не сходится, берётся самая свежая целая копия и догоняется по сохранённым
+    журналам, а испорченный файл откладывается в сторону, а не затирается.
+    """
+
+    def __init__(self, snapshot_path: Path, compact_min_entries: int = 1000, backups: int = 3) -> None:
+        self._snapshot_path = snapshot_path
+        self._journal_path = snapshot_path.with_suffix(".log")
+        self._rotated_path = snapshot_path.with_suffix(".log.compacting")
+        self._compact_min_entries = compact_min_entries
+        self._backups = backups
+
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._records: Dict[str, Dict[str, Any]] = {}
+        # Порядковые номера заявок для постраничного чтения курсором. Назначаются
+        # по порядку поступления при загрузке и не сохраняются на диск, поэтому
+        # каждая загрузка начинает новую эпоху курсоров.
+        self._seqs: Dict[str, int] = {}
+        self._cursor_epoch = ""
+        self._seq_keys: Dict[int, str] = {}
+        self._order: List[int] = []
+        self._lsn = 0
+        self._journal_entries = 0
+        self._journal: Optional[TextIO] = None
+        self._compactor: Optional[threading.Thread] = None
+        # Поколение растёт при каждом изменении данных; по нему кэш понимает, что устарел.
+        self._generation = 0
+        self._disk_stat: Tuple[Optional[Tuple[int, int]], ...] = ()
+
+    # --- открытие и восстановление -------------------------------------------------
+
+    def _ensure_open(self) -> None:
+        if self._journal is not None:
+            return
+        self._records, self._lsn, legacy, restored = self._load_snapshot()
+        self._reindex()
+        snapshot_lsn = self._lsn
+        if restored:
+            # Копия старше снапшота: догоняем её по журналам, которые он уже вобрал.
+            for number in range(self._backups, 0, -1):
+                self._journal_entries += self._replay(self._journal_backup_path(number), snapshot_lsn)
+        for path in (self._rotated_path, self._journal_path):
+            self._trim_torn_tail(path)
+            self._journal_entries += self._replay(path, snapshot_lsn)
+
+        if legacy or restored or self._rotated_path.exists():
+            # Старый формат, восстановление из копии или прерванное сжатие:
+            # всё уже в памяти, фиксируем снапшотом.
+            self._write_snapshot(list(self._records.items()), self._lsn)
+            self._retire_journals([self._rotated_path, self._journal_path])
+            self._reset_journal()
+        else:
+            self._journal = self._journal_path.open("a", encoding="utf-8")
+
+        self._generation += 1
+        self._disk_stat = self._stat_files()
+
+    def _reindex(self) -> None:
+        self._seqs = {key: seq for seq, key in enumerate(self._records, start=1)}
+        self._seq_keys = {seq: key for key, seq in self._seqs.items()}
+        self._order = list(self._seq_keys)
+        self._cursor_epoch = uuid.uuid4().hex[:12]
+
+    def _stat_files(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        stats = []
+        for path in (self._snapshot_path, self._journal_path):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                stats.append(None)
+            else:
+                stats.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stats)
+
+    def _reload(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        self._records = {}
+        self._lsn = 0
+        self._journal_entries = 0
+        self._ensure_open()
+
+    def signature(self) -> int:
+        """
+        Версия данных для кэша. Если файлы изменили снаружи (mtime/size не совпадают
+        с тем, что мы записали сами), состояние перечитывается с диска.
+        """
+        with self._lock:
+            self._ensure_open()
+            compacting = self._compactor is not None and self._compactor.is_alive()
+            if not compacting and self._stat_files() != self._disk_stat:
+                logging.info("Audit storage %s changed on disk; reloading.", self._snapshot_path)
+                self._reload()
+            return self._generation
+
+    def _reset_journal(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = self._journal_path.open("w", encoding="utf-8")
+        self._journal_entries = 0
+
+    def _backup_path(self, number: int) -> Path:
+        return self._snapshot_path.with_suffix(f".json.bak{number}")
+
+    def _journal_backup_path(self, number: int) -> Path:
+        return self._snapshot_path.with_suffix(f".log.bak{number}")
+
+    def _load_snapshot(self) -> Tuple[Dict[str, Dict[str, Any]], int, bool, bool]:
+        """
+        Снапшот или, если он испорчен, самая свежая целая резервная копия.
+        Флаги: снапшот в старом формате; основной снапшот испорчен (данные из копии или пусто).
+        """
+        candidates = [self._snapshot_path, *(self._backup_path(n) for n in range(1, self._backups + 1))]
+        damaged = False
+        for path in candidates:
+            if not path.exists():
+                continue
+            try:
+                records, lsn, legacy = self._read_snapshot(path)
+            except (OSError, ValueError) as exc:
+                logging.error("Audit snapshot %s is unreadable: %s", path, exc)
+                damaged = True
+                continue
+            if damaged:
+                logging.error("Restored audit storage from backup %s (lsn %s).", path, lsn)
+                self._quarantine_snapshot()
+            return records, lsn, legacy, damaged
+
+        if damaged:
+            logging.error("No valid audit snapshot or backup found; starting empty.")
+            self._quarantine_snapshot()
+        return {}, 0, False, damaged
+
+    def _quarantine_snapshot(self) -> None:
+        # Испорченный снапшот не удаляем и не пускаем в ротацию копий — его можно разобрать руками.
+        if self._snapshot_path.exists():
+            corrupt_path = self._snapshot_path.with_suffix(f".json.corrupt-{time.time_ns()}")
+            os.replace(self._snapshot_path, corrupt_path)
+            logging.error("Moved damaged audit snapshot to %s", corrupt_path)
+
+    @staticmethod
+    def _read_snapshot(path: Path) -> Tuple[Dict[str, Dict[str, Any]], int, bool]:
+        data = json.loads(path.read_text(encoding="utf-8"))
+
+        if isinstance(data, list):
+            # Старый формат: просто массив заявок без ключей.
+            records = {}
+            for item in data:
+                if isinstance(item, dict):
+                    key = str(item.setdefault("id", uuid.uuid4().hex))
+                    records[key] = item
+            return records, 0, True
+        if not isinstance(data, dict) or not isinstance(data.get("entries", []), list):
+            raise ValueError("unexpected snapshot layout")
+
+        lsn = int(data.get("lsn", 0))
+        entries = data.get("entries", [])
+        checksum = data.get("checksum")
+        # Снапшоты до появления контрольной суммы принимаются как есть.
+        if checksum is not None and checksum != _checksum(lsn, entries):
+            raise ValueError("checksum mismatch")
+
+        records = {}
+        for entry in entries:
+            if isinstance(entry, list) and len(entry) == 2 and isinstance(entry[1], dict):
+                key = str(entry[0])
+                entry[1].setdefault("id", key)
+                records[key] = entry[1]
+        return records, lsn, False
+
+    @staticmethod
+    def _trim_torn_tail(path: Path) -> None:
+        """Обрезает недописанную последнюю строку журнала, иначе к ней приклеится следующая запись."""
+        try:
+            with path.open("rb+") as journal:
+                size = journal.seek(0, os.SEEK_END)
+                if size == 0:
+                    return
+                journal.seek(size - 1)
+                if journal.read(1) == b"\n":
+                    return
+                # Ищем последний перевод строки с конца, блоками.
+                position = size
+                keep = 0
+                while position > 0:
+                    step = min(position, 64 * 1024)
+                    position -= step
+                    journal.seek(position)
+                    chunk = journal.read(step)
+                    newline = chunk.rfind(b"\n")
+                    if newline != -1:
+                        keep = position + newline + 1
+                        break
+                logging.warning("Trimming torn tail of audit journal %s (%s bytes).", path, size - keep)
+                journal.truncate(keep)
+                journal.flush()
+                os.fsync(journal.fileno())
+        except FileNotFoundError:
+            return
+
+    def _replay(self, path: Path, snapshot_lsn: int) -> int:
+        applied = 0
+        for entry in _read_journal(path, snapshot_lsn):
+            self._apply(entry)
+            self._lsn = max(self._lsn, int(entry.get("lsn", 0)))
+            applied += 1
+        return applied
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        op = entry.get("op")
+        key = str(entry.get("key"))
+        if op == "put" and isinstance(entry.get("record"), dict):
+            entry["record"].setdefault("id", key)
+            if key not in self._seqs:
+                seq = self._order[-1] + 1 if self._order else 1
+                self._seqs[key] = seq
+                self._seq_keys[seq] = key
+                self._order.append(seq)
+            self._records[key] = entry["record"]
+        elif op == "del" and self._records.pop(key, None) is not None:
+            seq = self._seqs.pop(key)
+            del self._seq_keys[seq]
+            del self._order[bisect_left(self._order, seq)]
+
+    # --- запись -------------------------------------------------------------------
+
+    def _append_entries(self, entries: List[Dict[str, Any]]) -> None:
+        # Пачка уходит в журнал одной записью и одним fsync — это и есть групповой коммит.
+        lines = []
+        for offset, entry in enumerate(entries, start=1):
+            entry["lsn"] = self._lsn + offset
+            lines.append(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._journal.write("".join(lines))
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._lsn += len(entries)
+        for entry in entries:
+            self._apply(entry)
+        self._journal_entries += len(entries)
+        self._generation += 1
+        self._disk_stat = self._stat_files()
+
+    def write_batch(self, writes: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> None:
+        """
+        Применяет пачку записей `(op, key, record)` одним fsync. `op`: `insert`
+        и `replace` кладут заявку целиком, `delete` удаляет её.
+        """
+        if not writes:
+            return
+        entries = [
+            {"op": "del", "key": key} if op == "delete" else {"op": "put", "key": key, "record": deepcopy(record)}
+            for op, key, record in writes
+        ]
+        with self._lock:
+            self._ensure_open()
+            self._append_entries(entries)
+            self._maybe_compact()
+
+    # --- чтение -------------------------------------------------------------------
+
+    def load(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_open()
+            return deepcopy(list(self._records.values()))
+
+    def scan(self, filters: AuditFilter = NO_FILTER, page_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Заявки по фильтру в порядке поступления, страницами. Копируется только
+        текущая страница; добавленные во время обхода заявки в него не попадают.
+        """
+        with self._lock:
+            self._ensure_open()
+            keys = list(self._records)
+        for start in range(0, len(keys), page_size):
+            with self._lock:
+                page = [self._records.get(key) for key in keys[start:start + page_size]]
+                matched = [deepcopy(record) for record in page if record is not None and filters.matches(record)]
+            if matched:
+                yield matched
+
+    def cursor_epoch(self) -> str:
+        """Меняется при каждой загрузке с диска: номера из `page` прошлой эпохи недействительны."""
+        with self._lock:
+            self._ensure_open()
+            return self._cursor_epoch
+
+    def page(
+        self,
+        filters: AuditFilter,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """
+        До `limit` заявок по фильтру с номерами (новые первыми): старше `before`,
+        новее `after` или самые свежие. Номера действуют в пределах `cursor_epoch`.
+        """
+        with self._lock:
+            self._ensure_open()
+            if after is not None:
+                positions = range(bisect_right(self._order, after), len(self._order))
+            else:
+                end = bisect_left(self._order, before) if before is not None else len(self._order)
+                positions = range(end - 1, -1, -1)
+
+            found: List[Tuple[int, Dict[str, Any]]] = []
+            for position in positions:
+                seq = self._order[position]
+                record = self._records[self._seq_keys[seq]]
+                if filters.matches(record):
+                    found.append((seq, deepcopy(record)))
+                    if len(found) >= limit:
+                        break
+        if after is not None:
+            found.reverse()
+        return found
+
+    # --- сжатие -------------------------------------------------------------------
+
+    def _maybe_compact(self) -> None:
+        threshold = max(self._compact_min_entries, len(self._records))
+        if self._journal_entries < threshold:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="audit-log-compactor", daemon=True)
+        self._compactor.start()
+
+    def compact(self) -> None:
+        """Сворачивает журнал в снапшот. Записи во время сжатия идут в новый журнал."""
+        with self._compact_lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        with self._lock:
+            self._ensure_open()
+            entries = list(self._records.items())
+            lsn = self._lsn
+            if self._rotated_path.exists():
+                # Прошлое сжатие сорвалось — сворачиваем всё синхронно, под блокировкой.
+                self._write_snapshot(entries, lsn)
+                self._journal.close()
+                self._journal = None
+                self._retire_journals([self._rotated_path, self._journal_path])
+                self._reset_journal()
+                self._disk_stat = self._stat_files()
+                return
+            self._journal.close()
+            os.replace(self._journal_path, self._rotated_path)
+            self._journal = self._journal_path.open("a", encoding="utf-8")
+            self._journal_entries = 0
+
+        try:
+            self._write_snapshot(entries, lsn)
+        except Exception:  # noqa: BLE001
+            logging.exception("Failed to compact audit log")
+            return
+        self._retire_journals([self._rotated_path])
+        with self._lock:
+            self._disk_stat = self._stat_files()
+
+    def _write_snapshot(self, entries: List[Tuple[str, Dict[str, Any]]], lsn: int) -> None:
+        items = [[key, record] for key, record in entries]
+        payload = {"lsn": lsn, "entries": items, "checksum": _checksum(lsn, items)}
+        # json.dumps без отступов идёт через C-кодировщик: с indent (или json.dump в файл)
+        # работает чистый Python, и на 100k заявок это секунды под GIL.
+        body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        tmp_path = self._snapshot_path.with_suffix(".json.tmp")
+        with tmp_path.open("w", encoding="utf-8") as file:
+            file.write(body)
+            file.flush()
+            os.fsync(file.fileno())
+        self._rotate_backups()
+        os.replace(tmp_path, self._snapshot_path)
+        _fsync_dir(self._snapshot_path.parent)
+
+    def _rotate_backups(self) -> None:
+        if self._backups <= 0 or not self._snapshot_path.exists():
+            return
+        for number in range(self._backups, 1, -1):
+            older = self._backup_path(number - 1)
+            if older.exists():
+                os.replace(older, self._backup_path(number))
+        # Жёсткая ссылка: текущий снапшот остаётся на месте до атомарной подмены.
+        newest = self._backup_path(1)
+        newest.unlink(missing_ok=True)
+        try:
+            os.link(self._snapshot_path, newest)
+        except OSError:
+            shutil.copy2(self._snapshot_path, newest)
+
+    def _retire_journals(self, paths: List[Path]) -> None:
+        """
+        Журналы, уже свёрнутые в снапшот, становятся `audits.log.bak1` (старые сдвигаются):
+        без них копия снапшота при восстановлении потеряла бы записи после себя.
+        """
+        paths = [path for path in paths if path.exists()]
+        if not paths:
+            return
+        if self._backups <= 0:
+            for path in paths:
+                path.unlink()
+            return
+        for number in range(self._backups, 1, -1):
+            older = self._journal_backup_path(number - 1)
+            if older.exists():
+                os.replace(older, self._journal_backup_path(number))
+        newest = self._journal_backup_path(1)
+        if len(paths) == 1:
+            os.replace(paths[0], newest)
+        else:
+            tmp_path = self._snapshot_path.with_suffix(".log.tmp")
+            with tmp_path.open("wb") as retired:
+                for path in paths:
+                    with path.open("rb") as journal:
+                        shutil.copyfileobj(journal, retired)
+                retired.flush()
+                os.fsync(retired.fileno())
+            os.replace(tmp_path, newest)
+            for path in paths:
+                path.unlink()
+        _fsync_dir(self._snapshot_path.parent)
+
+    def close(self) -> None:
+        with self._lock:
+            compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
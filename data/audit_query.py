@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class AuditFilter:
+    """
+    Отбор заявок для выгрузки и просмотра.
+
+    `since`/`until` — префиксы ISO-времени (например, `2025-01-31`): заявки
+    хранят timestamp строкой ISO, поэтому границы сравниваются как строки.
+    `since` включительно, `until` — нет.
+    """
+
+    since: Optional[str] = None
+    until: Optional[str] = None
+    audit_type: Optional[str] = None
+    goal: Optional[str] = None
+    status: Optional[str] = None
+
+    def matches(self, record: Mapping[str, Any]) -> bool:
+        timestamp = record.get("timestamp") or ""
+        if self.since is not None and timestamp < self.since:
+            return False
+        if self.until is not None and timestamp >= self.until:
+            return False
+        if self.audit_type is not None and record.get("audit_type") != self.audit_type:
+            return False
+        if self.goal is not None and record.get("goal") != self.goal:
+            return False
+        if self.status is not None and record.get("status", "open") != self.status:
+            return False
+        return True
+
+    def sql(self) -> Tuple[str, List[Any]]:
+        """Условие WHERE для таблицы audits; набор условий конечен, так что кэш выражений sqlite3 не раздувается."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        for clause, value in (
+            ("timestamp >= ?", self.since),
+            ("timestamp < ?", self.until),
+            ("audit_type = ?", self.audit_type),
+            ("goal = ?", self.goal),
+            ("status = ?", self.status),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return " AND ".join(clauses), params
+
+
+NO_FILTER = AuditFilter()
+
+
+@dataclass(frozen=True)
+class AuditPage:
+    """Страница заявок (новые первыми) с курсорами для перехода к соседним."""
+
+    records: List[Dict[str, Any]] = field(default_factory=list)
+    newest: Optional[int] = None
+    oldest: Optional[int] = None
+    has_newer: bool = False
+    has_older: bool = False
+    # Эпоха курсоров хранилища: курсоры другой эпохи указывают не на те заявки.
+    epoch: Optional[str] = None
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from data.audit_log import read_audits
+from data.audit_query import NO_FILTER, AuditFilter
+from data.sqlite_db import connect_sqlite
+
+
+# Все запросы — константы: sqlite3 кэширует подготовленные выражения по тексту SQL,
+# так что на горячем пути они не перекомпилируются.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audits (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    user_id INTEGER,
+    username TEXT,
+    audit_type TEXT,
+    goal TEXT,
+    link TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_audits_timestamp ON audits(timestamp);
+CREATE INDEX IF NOT EXISTS idx_audits_user_id ON audits(user_id);
+CREATE INDEX IF NOT EXISTS idx_audits_audit_type ON audits(audit_type);
+CREATE INDEX IF NOT EXISTS idx_audits_goal ON audits(goal);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Версии схемы поверх базовой таблицы; номер хранится в PRAGMA user_version.
+_MIGRATIONS = {
+    1: """
+    ALTER TABLE audits ADD COLUMN audit_id TEXT;
+    ALTER TABLE audits ADD COLUMN status TEXT NOT NULL DEFAULT 'open';
+    ALTER TABLE audits ADD COLUMN resolved_at TEXT;
+    UPDATE audits SET audit_id = lower(hex(randomblob(16))) WHERE audit_id IS NULL;
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_audits_audit_id ON audits(audit_id);
+    CREATE INDEX IF NOT EXISTS idx_audits_status ON audits(status, seq);
+    """,
+}
+
+_RECORD_COLUMNS = "payload, audit_id, status, resolved_at"
+_INSERT_AUDIT = (
+    "INSERT INTO audits (timestamp, user_id, username, audit_type, goal, link, payload, audit_id, status, resolved_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SELECT_ALL = f"SELECT {_RECORD_COLUMNS} FROM audits ORDER BY seq"
+_SELECT_OLDER = f"SELECT seq, {_RECORD_COLUMNS} FROM audits WHERE seq < ?{{where}} ORDER BY seq DESC LIMIT ?"
+_SELECT_NEWER = f"SELECT seq, {_RECORD_COLUMNS} FROM audits WHERE seq > ?{{where}} ORDER BY seq LIMIT ?"
+_SELECT_PAGE = f"SELECT seq, {_RECORD_COLUMNS} FROM audits WHERE seq > ?{{where}} ORDER BY seq LIMIT ?"
+_UPDATE = "UPDATE audits SET status = ?, resolved_at = ?, payload = ? WHERE audit_id = ?"
+_DELETE = "DELETE FROM audits WHERE audit_id = ?"
+_GET_META = "SELECT value FROM meta WHERE key = ?"
+_SET_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+
+_MIGRATED_KEY = "migrated_from_json"
+_COLUMN_FIELDS = ("id", "status", "resolved_at")
+
+
+def _payload(record: Dict[str, Any]) -> str:
+    # id, status и resolved_at живут в отдельных колонках и в payload не дублируются.
+    return json.dumps(
+        {key: value for key, value in record.items() if key not in _COLUMN_FIELDS},
+        ensure_ascii=False,
+    )
+
+
+def _row_params(record: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        record.get("timestamp") or "",
+        record.get("user_id"),
+        record.get("username"),
+        record.get("audit_type"),
+        record.get("goal"),
+        record.get("link"),
+        _payload(record),
+        record["id"],
+        record.get("status") or "open",
+        record.get("resolved_at"),
+    )
+
+
+def _to_record(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    payload, audit_id, status, resolved_at = row
+    record = json.loads(payload)
+    record["id"] = audit_id
+    record["status"] = status
+    if resolved_at is not None:
+        record["resolved_at"] = resolved_at
+    return record
+
+
+def _migrate_schema(conn: sqlite3.Connection) -> None:
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    for target in sorted(_MIGRATIONS):
+        if target <= version:
+            continue
+        conn.executescript(f"BEGIN;\n{_MIGRATIONS[target]}\nPRAGMA user_version = {target};\nCOMMIT;")
+
+
+class SQLiteAuditStore:
+    """
+    Хранилище заявок на SQLite (WAL) с тем же интерфейсом, что и AuditLog.
+
+    Держит одно долгоживущее соединение; обращения из `asyncio.to_thread`
+    сериализуются блокировкой.
+    """
+
+    def __init__(self, db_path: Path, legacy_json: Optional[Path] = None) -> None:
+        self._db_path = db_path
+        self._legacy_json = legacy_json
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._generation = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+        # FULL: подтверждённая пользователю заявка не должна пропасть при отключении питания.
+        conn = connect_sqlite(self._db_path, _SCHEMA, synchronous="FULL")
+        _migrate_schema(conn)
+        self._conn = conn
+        if self._legacy_json is not None:
+            migrate_from_json(conn, self._legacy_json)
+        return conn
+
+    def signature(self) -> Tuple[int, int]:
+        """
+        Версия данных для кэша: свои записи считаем сами, а чужие коммиты
+        (другой процесс, ручная правка базы) видны через PRAGMA data_version.
+        """
+        with self._lock:
+            (data_version,) = self._connection().execute("PRAGMA data_version").fetchone()
+            return data_version, self._generation
+
+    def load(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._connection().execute(_SELECT_ALL).fetchall()
+        return [_to_record(row) for row in rows]
+
+    def cursor_epoch(self) -> str:
+        # seq хранится в базе и не переназначается — курсоры переживают перезапуск.
+        return "seq"
+
+    def page(
+        self,
+        filters: AuditFilter,
+        limit: int,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        """До `limit` заявок по фильтру с их seq (новые первыми): старше `before`, новее `after` или самые свежие."""
+        where, params = filters.sql()
+        where = f" AND {where}" if where else ""
+        if after is not None:
+            sql, cursor = _SELECT_NEWER.format(where=where), after
+        else:
+            # Без курсора — начиная с самой свежей заявки.
+            sql, cursor = _SELECT_OLDER.format(where=where), before if before is not None else 2 ** 63 - 1
+        with self._lock:
+            rows = self._connection().execute(sql, (cursor, *params, limit)).fetchall()
+        page = [(row[0], _to_record(row[1:])) for row in rows]
+        if after is not None:
+            page.reverse()
+        return page
+
+    def scan(self, filters: AuditFilter = NO_FILTER, page_size: int = 500) -> Iterator[List[Dict[str, Any]]]:
+        """Заявки по фильтру в порядке поступления, страницами по seq — в памяти только одна страница."""
+        where, params = filters.sql()
+        sql = _SELECT_PAGE.format(where=f" AND {where}" if where else "")
+        cursor = 0
+        while True:
+            with self._lock:
+                rows = self._connection().execute(sql, (cursor, *params, page_size)).fetchall()
+            if not rows:
+                return
+            cursor = rows[-1][0]
+            yield [_to_record(row[1:]) for row in rows]
+
+    def write_batch(self, writes: List[Tuple[str, str, Optional[Dict[str, Any]]]]) -> None:
+        """Применяет пачку записей `(op, key, record)` одной транзакцией (см. AuditLog.write_batch)."""
+        if not writes:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                for op, key, record in writes:
+                    if op == "insert":
+                        conn.execute(_INSERT_AUDIT, _row_params(record))
+                    elif op == "replace":
+                        conn.execute(
+                            _UPDATE,
+                            (record.get("status") or "open", record.get("resolved_at"), _payload(record), key),
+                        )
+                    else:
+                        conn.execute(_DELETE, (key,))
+            self._generation += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def migrate_from_json(conn: sqlite3.Connection, json_path: Path) -> int:
+    """
+    Однократно переносит заявки из JSON-хранилища (снапшот + журнал) в SQLite.
+    Повторный вызов ничего не делает: факт миграции хранится в таблице meta.
+    """
+    if conn.execute(_GET_META, (_MIGRATED_KEY,)).fetchone() is not None:
+        return 0
+
+    # Только чтение: исходные файлы остаются нетронутыми на случай отката на JSON.
+    records = read_audits(json_path)
+
+    with conn:
+        conn.executemany(_INSERT_AUDIT, (_row_params(record) for record in records))
+        conn.execute(_SET_META, (_MIGRATED_KEY, str(json_path)))
+
+    if records:
+        logging.info("Migrated %s audits from %s to SQLite.", len(records), json_path)
+    return len(records)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+
+def _resolve_minutes(record: Mapping[str, Any]) -> Optional[int]:
+    if record.get("status") != "resolved":
+        return None
+    try:
+        created = datetime.fromisoformat(record["timestamp"])
+        resolved = datetime.fromisoformat(record["resolved_at"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return max(int((resolved - created).total_seconds() // 60), 0)
+
+
+class AuditStats:
+    """
+    Агрегаты по заявкам, которые обновляются на каждой записи.
+
+    Добавление и удаление заявки меняют счётчики за O(1); изменение — это
+    удаление старой версии и добавление новой. Время до разбора копится
+    гистограммой по минутам, медиана считается по ней и кэшируется до
+    следующего изменения. `version` растёт на каждом изменении — по нему
+    кэшируют производные сводки.
+    """
+
+    def __init__(self, records: Iterable[Mapping[str, Any]] = ()) -> None:
+        self.total = 0
+        self.by_status: Counter = Counter()
+        self.by_type: Counter = Counter()
+        self.by_goal: Counter = Counter()
+        self.by_day: Counter = Counter()
+        self._resolve_histogram: Counter = Counter()
+        self._resolved_count = 0
+        self._median: Optional[float] = None
+        self._median_stale = True
+        self.version = 0
+        for record in records:
+            self.add(record)
+
+    def _apply(self, record: Mapping[str, Any], sign: int) -> None:
+        self.version += 1
+        self.total += sign
+        self.by_status[record.get("status") or "open"] += sign
+        self.by_type[record.get("audit_type") or "—"] += sign
+        self.by_goal[record.get("goal") or "—"] += sign
+        self.by_day[(record.get("timestamp") or "")[:10]] += sign
+        minutes = _resolve_minutes(record)
+        if minutes is not None:
+            self._resolve_histogram[minutes] += sign
+            self._resolved_count += sign
+            self._median_stale = True
+
+    def add(self, record: Mapping[str, Any]) -> None:
+        self._apply(record, 1)
+
+    def remove(self, record: Mapping[str, Any]) -> None:
+        self._apply(record, -1)
+
+    def replace(self, old: Mapping[str, Any], new: Mapping[str, Any]) -> None:
+        self._apply(old, -1)
+        self._apply(new, 1)
+
+    def merged(self, other: "AuditStats") -> "AuditStats":
+        """Сумма двух наборов агрегатов (горячее хранилище + архив); исходные не меняются."""
+        combined = AuditStats()
+        for name in ("by_status", "by_type", "by_goal", "by_day", "_resolve_histogram"):
+            counter: Counter = getattr(combined, name)
+            counter.update(getattr(self, name))
+            counter.update(getattr(other, name))
+        combined.total = self.total + other.total
+        combined._resolved_count = self._resolved_count + other._resolved_count
+        return combined
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "by_status": dict(self.by_status),
+            "by_type": dict(self.by_type),
+            "by_goal": dict(self.by_goal),
+            "by_day": dict(self.by_day),
+            "resolve_histogram": {str(minutes): hits for minutes, hits in self._resolve_histogram.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "AuditStats":
+        stats = cls()
+        stats.total = int(data.get("total", 0))
+        for name in ("by_status", "by_type", "by_goal", "by_day"):
+            getattr(stats, name).update(data.get(name, {}))
+        stats._resolve_histogram.update(
+            {int(minutes): hits for minutes, hits in data.get("resolve_histogram", {}).items()}
+        )
+        stats._resolved_count = sum(stats._resolve_histogram.values())
+        return stats
+
+    def median_resolve_minutes(self) -> Optional[float]:
+        if self._median_stale:
+            self._median = self._compute_median()
+            self._median_stale = False
+        return self._median
+
+    def _compute_median(self) -> Optional[float]:
+        count = self._resolved_count
+        if count <= 0:
+            return None
+        lower_rank, upper_rank = (count - 1) // 2, count // 2
+        lower = upper = None
+        seen = 0
+        for minutes in sorted(bucket for bucket, hits in self._resolve_histogram.items() if hits > 0):
+            seen += self._resolve_histogram[minutes]
+            if lower is None and seen > lower_rank:
+                lower = minutes
+            if seen > upper_rank:
+                upper = minutes
+                break
+        return (lower + upper) / 2
+
+    def snapshot(self, days: int = 7) -> Dict[str, Any]:
+        """Готовые цифры для экрана статистики; `days` — сколько последних дней показать."""
+        recent_days: List[Tuple[str, int]] = sorted(
+            ((day, hits) for day, hits in self.by_day.items() if hits > 0 and day),
+            reverse=True,
+        )[:days]
+        return {
+            "total": self.total,
+            "open": self.by_status["open"],
+            "resolved": self.by_status["resolved"],
+            "by_type": {key: hits for key, hits in self.by_type.most_common() if hits > 0},
+            "by_goal": {key: hits for key, hits in self.by_goal.most_common() if hits > 0},
+            "by_day": dict(recent_days),
+            "median_resolve_minutes": self.median_resolve_minutes(),
+        }
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from data.config import get_config
+from data.sqlite_db import connect_sqlite
+from data.storage import flush_users, init_user_schema
+
+
+# Задания живут в той же базе, что и реестр пользователей: список получателей
+# снимается одним INSERT ... SELECT, без выгрузки аудитории в Python.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS broadcast_jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    chat_id INTEGER NOT NULL,
+    progress_message_id INTEGER,
+    total INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS broadcast_recipients (
+    job_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    PRIMARY KEY (job_id, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_broadcast_recipients_status
+    ON broadcast_recipients(job_id, status, user_id);
+"""
+
+_INSERT_JOB = "INSERT INTO broadcast_jobs (text, chat_id, created_at) VALUES (?, ?, ?)"
+_SNAPSHOT_RECIPIENTS = (
+    "INSERT INTO broadcast_recipients (job_id, user_id) "
+    "SELECT ?, user_id FROM users WHERE blocked = 0"
+)
+_SET_TOTAL = "UPDATE broadcast_jobs SET total = ? WHERE job_id = ?"
+_SET_PROGRESS_MESSAGE = "UPDATE broadcast_jobs SET progress_message_id = ? WHERE job_id = ?"
+_FINISH_JOB = "UPDATE broadcast_jobs SET status = ?, finished_at = ? WHERE job_id = ?"
+_JOB_COLUMNS = "job_id, text, status, chat_id, progress_message_id, total"
+_SELECT_RUNNING = f"SELECT {_JOB_COLUMNS} FROM broadcast_jobs WHERE status = 'running' ORDER BY job_id"
+_SELECT_PENDING_PAGE = (
+    "SELECT user_id FROM broadcast_recipients "
+    "WHERE job_id = ? AND status = 'pending' AND user_id > ? ORDER BY user_id LIMIT ?"
+)
+_UPDATE_RECIPIENT = "UPDATE broadcast_recipients SET status = ? WHERE job_id = ? AND user_id = ?"
+_COUNT_BY_STATUS = "SELECT status, COUNT(*) FROM broadcast_recipients WHERE job_id = ? GROUP BY status"
+_COUNT_PENDING_RUNNING = (
+    "SELECT COUNT(*) FROM broadcast_recipients r JOIN broadcast_jobs j ON j.job_id = r.job_id "
+    "WHERE j.status = 'running' AND r.status = 'pending'"
+)
+
+
+@dataclass
+class BroadcastJob:
+    job_id: int
+    text: str
+    status: str
+    chat_id: int
+    progress_message_id: Optional[int]
+    total: int
+
+
+class BroadcastJobStore:
+    """
+    Постоянные задания рассылки с курсором по каждому получателю.
+
+    Статус получателя (pending/sent/failed/blocked) фиксируется пачками, поэтому
+    после перезапуска рассылка продолжается с оставшихся pending, а повторно
+    может уйти не больше одной несброшенной пачки.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = connect_sqlite(self._db_path, _SCHEMA)
+            # INSERT ... SELECT читает users: схема реестра нужна, даже если он ещё ничего не записал.
+            init_user_schema(conn)
+            self._conn = conn
+        return self._conn
+
+    def create(self, text: str, chat_id: int) -> BroadcastJob:
+        flush_users()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                job_id = conn.execute(_INSERT_JOB, (text, chat_id, datetime.utcnow().isoformat())).lastrowid
+                total = conn.execute(_SNAPSHOT_RECIPIENTS, (job_id,)).rowcount
+                conn.execute(_SET_TOTAL, (total, job_id))
+        return BroadcastJob(job_id, text, "running", chat_id, None, total)
+
+    def running(self) -> List[BroadcastJob]:
+        with self._lock:
+            rows = self._connection().execute(_SELECT_RUNNING).fetchall()
+        return [BroadcastJob(*row) for row in rows]
+
+    def set_progress_message(self, job_id: int, message_id: int) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(_SET_PROGRESS_MESSAGE, (message_id, job_id))
+
+    def iter_pending_pages(self, job_id: int, page_size: int = 500) -> Iterator[List[int]]:
+        cursor = 0
+        while True:
+            with self._lock:
+                rows = self._connection().execute(_SELECT_PENDING_PAGE, (job_id, cursor, page_size)).fetchall()
+            if not rows:
+                return
+            page = [user_id for (user_id,) in rows]
+            yield page
+            cursor = page[-1]
+
+    def record_results(self, job_id: int, results: Iterable[Tuple[int, str]]) -> None:
+        rows = [(status, job_id, user_id) for user_id, status in results]
+        if not rows:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(_UPDATE_RECIPIENT, rows)
+
+    def counts(self, job_id: int) -> Dict[str, int]:
+        with self._lock:
+            rows = self._connection().execute(_COUNT_BY_STATUS, (job_id,)).fetchall()
+        return dict(rows)
+
+    def pending_total(self) -> int:
+        with self._lock:
+            (pending,) = self._connection().execute(_COUNT_PENDING_RUNNING).fetchone()
+        return pending
+
+    def finish(self, job_id: int, status: str = "done") -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(_FINISH_JOB, (status, datetime.utcnow().isoformat(), job_id))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_store = BroadcastJobStore(Path(get_config().users_db_path))
+
+
+def create_broadcast_job(text: str, chat_id: int) -> BroadcastJob:
+    """Создаёт задание и фиксирует текущий список активных получателей."""
+    return _store.create(text, chat_id)
+
+
+def running_broadcast_jobs() -> List[BroadcastJob]:
+    return _store.running()
+
+
+def set_progress_message(job_id: int, message_id: int) -> None:
+    _store.set_progress_message(job_id, message_id)
+
+
+def iter_pending_recipient_pages(job_id: int, page_size: int = 500) -> Iterator[List[int]]:
+    return _store.iter_pending_pages(job_id, page_size)
+
+
+def record_broadcast_results(job_id: int, results: Iterable[Tuple[int, str]]) -> None:
+    _store.record_results(job_id, results)
+
+
+def broadcast_job_counts(job_id: int) -> Dict[str, int]:
+    return _store.counts(job_id)
+
+
+def pending_broadcast_recipients() -> int:
+    """Сколько получателей ещё ждут сообщения во всех идущих рассылках."""
+    return _store.pending_total()
+
+
+def finish_broadcast_job(job_id: int, status: str = "done") -> None:
+    _store.finish(job_id, status)
+
+
+def close_broadcast_jobs() -> None:
+    _store.close()
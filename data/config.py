@@ -1,18 +1,50 @@
 import logging
 import os
 from dataclasses import dataclass
+from pathlib import Path
+from typing import Tuple
 
 from dotenv import load_dotenv
 
 
 load_dotenv()
 
+_DATA_DIR = Path(__file__).resolve().parent
+
 
 @dataclass(frozen=True)
 class Config:
     bot_token: str
     admin_username: str
+    admin_ids: Tuple[int, ...]
     follow_up_delay_hours: int
+    audit_storage_backend: str
+    audit_json_path: str
+    audit_db_path: str
+    audit_commit_window_ms: int
+    audit_archive_dir: str
+    audit_archive_after_days: int
+    audit_archive_interval_minutes: int
+    users_db_path: str
+    broadcast_rate_per_second: int
+    broadcast_concurrency: int
+    scheduler_db_path: str
+    follow_up_db_path: str
+    follow_up_batch_size: int
+    follow_up_dispatch_interval_seconds: int
+    follow_up_rate_per_second: int
+    follow_up_max_lateness_hours: int
+    fsm_storage: str
+    fsm_db_path: str
+    fsm_redis_url: str
+    fsm_state_ttl_seconds: int
+    bot_mode: str
+    web_server_port: int
+    webhook_base_url: str
+    webhook_path: str
+    webhook_secret: str
+    guides_catalog_path: str
+    metrics_token: str
 
 
 def _get_int_env(var_name: str, default: int) -> int:
@@ -26,10 +58,55 @@ def _get_int_env(var_name: str, default: int) -> int:
         return default
 
 
+def _get_int_list_env(var_name: str) -> Tuple[int, ...]:
+    values = []
+    for item in os.getenv(var_name, "").replace(";", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            values.append(int(item))
+        except ValueError:
+            logging.warning("Invalid value in %s: %s. Skipping.", var_name, item)
+    return tuple(values)
+
+
 def get_config() -> Config:
     """Return configuration populated from environment variables."""
     return Config(
         bot_token=os.getenv("BOT_TOKEN", ""),
         admin_username=os.getenv("ADMIN_USERNAME", ""),
+        admin_ids=_get_int_list_env("ADMIN_IDS"),
         follow_up_delay_hours=_get_int_env("FOLLOW_UP_DELAY_HOURS", 48),
+        audit_storage_backend=os.getenv("AUDIT_STORAGE_BACKEND", "jsonl").strip().lower(),
+        audit_json_path=os.getenv("AUDIT_JSON_PATH", str(_DATA_DIR / "audits.json")),
+        audit_db_path=os.getenv("AUDIT_DB_PATH", str(_DATA_DIR / "audits.db")),
+        # Сколько писатель заявок ждёт попутчиков для группового коммита.
+        audit_commit_window_ms=_get_int_env("AUDIT_COMMIT_WINDOW_MS", 5),
+        # Разобранные заявки старше стольких дней уезжают в сжатый архив.
+        audit_archive_dir=os.getenv("AUDIT_ARCHIVE_DIR", str(_DATA_DIR / "archive")),
+        audit_archive_after_days=_get_int_env("AUDIT_ARCHIVE_AFTER_DAYS", 3),
+        audit_archive_interval_minutes=_get_int_env("AUDIT_ARCHIVE_INTERVAL_MINUTES", 60),
+        users_db_path=os.getenv("USERS_DB_PATH", str(_DATA_DIR / "users.db")),
+        # Глобальный лимит Telegram — около 30 сообщений в секунду; оставляем запас.
+        broadcast_rate_per_second=_get_int_env("BROADCAST_RATE_PER_SECOND", 25),
+        broadcast_concurrency=_get_int_env("BROADCAST_CONCURRENCY", 8),
+        scheduler_db_path=os.getenv("SCHEDULER_DB_PATH", str(_DATA_DIR / "scheduler.db")),
+        follow_up_db_path=os.getenv("FOLLOW_UP_DB_PATH", str(_DATA_DIR / "follow_ups.db")),
+        follow_up_batch_size=_get_int_env("FOLLOW_UP_BATCH_SIZE", 20),
+        follow_up_dispatch_interval_seconds=_get_int_env("FOLLOW_UP_DISPATCH_INTERVAL_SECONDS", 30),
+        follow_up_rate_per_second=_get_int_env("FOLLOW_UP_RATE_PER_SECOND", 5),
+        follow_up_max_lateness_hours=_get_int_env("FOLLOW_UP_MAX_LATENESS_HOURS", 24),
+        fsm_storage=os.getenv("FSM_STORAGE", "sqlite").strip().lower(),
+        fsm_db_path=os.getenv("FSM_DB_PATH", str(_DATA_DIR / "fsm.db")),
+        fsm_redis_url=os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0"),
+        fsm_state_ttl_seconds=_get_int_env("FSM_STATE_TTL_SECONDS", 24 * 3600),
+        bot_mode=os.getenv("BOT_MODE", "polling").strip().lower(),
+        web_server_port=_get_int_env("PORT", 10000),
+        webhook_base_url=os.getenv("WEBHOOK_BASE_URL", "").rstrip("/"),
+        webhook_path=os.getenv("WEBHOOK_PATH", "/telegram/webhook"),
+        webhook_secret=os.getenv("WEBHOOK_SECRET", ""),
+        guides_catalog_path=os.getenv("GUIDES_CATALOG_PATH", str(_DATA_DIR / "guides.json")),
+        # Если задан, /metrics отдаётся только с `Authorization: Bearer <token>` или `?token=`.
+        metrics_token=os.getenv("METRICS_TOKEN", ""),
     )
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data.config import get_config
+from data.sqlite_db import connect_sqlite
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS follow_ups (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT,
+    due_at REAL NOT NULL,
+    enqueued_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_follow_ups_due_at ON follow_ups(due_at);
+"""
+
+_UPSERT = (
+    "INSERT INTO follow_ups (user_id, username, due_at, enqueued_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT(user_id) DO UPDATE SET username = excluded.username, "
+    "due_at = excluded.due_at, enqueued_at = excluded.enqueued_at"
+)
+_SELECT_DUE = "SELECT user_id, username, due_at FROM follow_ups WHERE due_at <= ? ORDER BY due_at LIMIT ?"
+_ACK = "DELETE FROM follow_ups WHERE user_id = ? AND due_at = ?"
+_DROP_STALE = "DELETE FROM follow_ups WHERE due_at < ?"
+_STATS = "SELECT COUNT(*), SUM(due_at <= ?), MIN(due_at) FROM follow_ups"
+
+
+class FollowUpQueue:
+    """
+    Очередь follow-up сообщений, упорядоченная по времени отправки (индекс по due_at).
+
+    На пользователя — одна запись: повторная заявка переносит срок, а не
+    добавляет второе напоминание. Подтверждение (`ack`) удаляет запись только
+    если её срок не поменялся, пока сообщение отправлялось.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self._db_path = db_path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = connect_sqlite(self._db_path, _SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def enqueue(self, user_id: int, username: Optional[str], due_at: float, now: float) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(_UPSERT, (user_id, username, due_at, now))
+
+    def due(self, now: float, limit: int) -> List[Tuple[int, Optional[str], float]]:
+        with self._lock:
+            return self._connection().execute(_SELECT_DUE, (now, limit)).fetchall()
+
+    def ack(self, items: Iterable[Tuple[int, float]]) -> None:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(_ACK, list(items))
+
+    def drop_stale(self, cutoff: float) -> int:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                return conn.execute(_DROP_STALE, (cutoff,)).rowcount
+
+    def stats(self, now: float) -> Dict[str, float]:
+        with self._lock:
+            depth, due, oldest = self._connection().execute(_STATS, (now,)).fetchone()
+        return {
+            "depth": depth,
+            "due": due or 0,
+            "lag_seconds": max(now - oldest, 0.0) if oldest is not None else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_queue = FollowUpQueue(Path(get_config().follow_up_db_path))
+
+
+def enqueue_follow_up(user_id: int, username: Optional[str], due_at: float, now: float) -> None:
+    _queue.enqueue(user_id, username, due_at, now)
+
+
+def due_follow_ups(now: float, limit: int) -> List[Tuple[int, Optional[str], float]]:
+    return _queue.due(now, limit)
+
+
+def ack_follow_ups(items: Iterable[Tuple[int, float]]) -> None:
+    _queue.ack(items)
+
+
+def drop_stale_follow_ups(cutoff: float) -> int:
+    return _queue.drop_stale(cutoff)
+
+
+def follow_up_queue_stats(now: float) -> Dict[str, float]:
+    """Глубина очереди, сколько уже пора отправить и отставание самого старого."""
+    return _queue.stats(now)
+
+
+def close_follow_up_queue() -> None:
+    _queue.close()
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from data.config import Config, get_config
+from data.sqlite_db import connect_sqlite
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fsm_updated_at ON fsm(updated_at);
+"""
+
+_SELECT = "SELECT state, data, updated_at FROM fsm WHERE key = ?"
+_UPSERT_STATE = (
+    "INSERT INTO fsm (key, state, updated_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at"
+)
+_UPSERT_DATA = (
+    "INSERT INTO fsm (key, data, updated_at) VALUES (?, ?, ?) "
+    "ON CONFLICT(key) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at"
+)
+_DELETE_EMPTY = "DELETE FROM fsm WHERE key = ? AND state IS NULL AND data = '{}'"
+_DELETE_KEY = "DELETE FROM fsm WHERE key = ?"
+_PURGE = "DELETE FROM fsm WHERE updated_at < ?"
+
+
+def _key(key: StorageKey) -> str:
+    return ":".join(
+        str(part) if part is not None else ""
+        for part in (
+            key.bot_id,
+            key.chat_id,
+            key.user_id,
+            key.thread_id,
+            key.business_connection_id,
+            key.destiny,
+        )
+    )
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram в локальном SQLite.
+
+    Пользователь, застрявший посреди AuditStates, переживает перезапуск бота.
+    Сессии, не менявшиеся дольше `ttl` секунд, считаются брошенными: они не
+    отдаются при чтении и периодически вычищаются одним DELETE по индексу.
+    """
+
+    def __init__(self, db_path: Path, ttl: int, purge_interval: float = 600.0) -> None:
+        self._db_path = db_path
+        self._ttl = ttl
+        self._purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = connect_sqlite(self._db_path, _SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _read(self, key: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(_SELECT, (key,)).fetchone()
+            if row is None:
+                return None, {}
+            state, data, updated_at = row
+            if self._ttl > 0 and updated_at < time.time() - self._ttl:
+                with conn:
+                    conn.execute(_DELETE_KEY, (key,))
+                return None, {}
+        return state, json.loads(data)
+
+    def _write(self, sql: str, key: str, value: Optional[str]) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(sql, (key, value, now))
+                conn.execute(_DELETE_EMPTY, (key,))
+                if self._ttl > 0 and now - self._last_purge >= self._purge_interval:
+                    conn.execute(_PURGE, (now - self._ttl,))
+                    self._last_purge = now
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await asyncio.to_thread(self._write, _UPSERT_STATE, _key(key), value)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await asyncio.to_thread(self._read, _key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        payload = json.dumps(data, ensure_ascii=False)
+        await asyncio.to_thread(self._write, _UPSERT_DATA, _key(key), payload)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await asyncio.to_thread(self._read, _key(key))
+        return data
+
+    async def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+def create_fsm_storage(config: Optional[Config] = None) -> BaseStorage:
+    """
+    Хранилище FSM по FSM_STORAGE: `sqlite` (по умолчанию), `redis` или `memory`.
+
+    Для redis нужен пакет `redis`; подойдёт любой Redis-совместимый сервер,
+    в том числе локальный для разработки.
+    """
+    config = config or get_config()
+    ttl = max(config.fsm_state_ttl_seconds, 0)
+
+    if config.fsm_storage == "memory":
+        return MemoryStorage()
+    if config.fsm_storage == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as exc:
+            raise RuntimeError("FSM_STORAGE=redis requires the 'redis' package to be installed.") from exc
+        return RedisStorage.from_url(
+            config.fsm_redis_url,
+            state_ttl=ttl or None,
+            data_ttl=ttl or None,
+        )
+    return SQLiteStorage(Path(config.fsm_db_path), ttl=ttl)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from data.config import get_config
+
+
+@dataclass(frozen=True)
+class GuideItem:
+    label: str
+    url: str
+
+
+@dataclass(frozen=True)
+class GuideSection:
+    section_id: str
+    title: str
+    items: Tuple[GuideItem, ...]
+
+
+@dataclass(frozen=True)
+class Catalog:
+    menu_title: str
+    sections: Dict[str, GuideSection]
+    order: Tuple[str, ...]
+    version: int
+
+
+def _parse(raw: dict, version: int) -> Catalog:
+    sections: Dict[str, GuideSection] = {}
+    for entry in raw["sections"]:
+        section_id = str(entry["id"])
+        if section_id in sections:
+            raise ValueError(f"Duplicate guides section id: {section_id}")
+        sections[section_id] = GuideSection(
+            section_id=section_id,
+            title=entry["title"],
+            items=tuple(GuideItem(item["label"], item["url"]) for item in entry.get("items", [])),
+        )
+    return Catalog(
+        menu_title=raw.get("menu_title", ""),
+        sections=sections,
+        order=tuple(sections),
+        version=version,
+    )
+
+
+class GuidesCatalog:
+    """
+    Каталог гайдов из JSON-файла, проиндексированный по id раздела.
+
+    Не чаще раза в `check_interval` секунд сверяются mtime и размер файла:
+    отредактированный каталог подхватывается без перезапуска. Если новый файл не читается,
+    остаётся последняя удачная версия.
+    """
+
+    def __init__(self, path: Path, check_interval: float = 1.0) -> None:
+        self._path = path
+        self._check_interval = check_interval
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stat: Optional[Tuple[int, int]] = None
+        self._catalog: Optional[Catalog] = None
+
+    def _disk_stat(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def get(self) -> Catalog:
+        now = time.monotonic()
+        if self._catalog is not None and now - self._checked_at < self._check_interval:
+            return self._catalog
+        self._checked_at = now
+        stat = self._disk_stat()
+        if self._catalog is not None and stat == self._stat:
+            return self._catalog
+        with self._lock:
+            if self._catalog is None or stat != self._stat:
+                self._reload(stat)
+        return self._catalog
+
+    def _reload(self, stat: Optional[Tuple[int, int]]) -> None:
+        version = (self._catalog.version + 1) if self._catalog is not None else 1
+        try:
+            with self._path.open("r", encoding="utf-8") as file:
+                catalog = _parse(json.load(file), version)
+        except Exception as exc:  # noqa: BLE001
+            logging.exception("Failed to load guides catalog from %s: %s", self._path, exc)
+            if self._catalog is None:
+                self._catalog = Catalog("", {}, (), version)
+        else:
+            self._catalog = catalog
+            logging.info("Loaded guides catalog v%s: %s sections", version, len(catalog.sections))
+        # Запоминаем stat и при ошибке, чтобы не перечитывать битый файл на каждый апдейт.
+        self._stat = stat
+
+
+_catalog = GuidesCatalog(Path(get_config().guides_catalog_path))
+
+
+def get_guides_catalog() -> Catalog:
+    return _catalog.get()
+
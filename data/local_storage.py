@@ -1,45 +1,399 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
 from copy import deepcopy
-from datetime import datetime
+from datetime import datetime, timedelta
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List
+from types import MappingProxyType
+from typing import Any, DefaultDict, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
 
+from data.audit_archive import AuditArchive
+from data.audit_log import AuditLog
+from data.audit_query import NO_FILTER, AuditFilter, AuditPage
+from data.audit_stats import AuditStats
+from data.audit_sqlite import SQLiteAuditStore
+from data.config import get_config
+from utils.background import collect_batch
 
-_STORAGE_FILE = Path(__file__).resolve().parent / "audits.json"
 
+# Изменение заявки: ("save", id, заявка) | ("resolve", id, поля) | ("remove", id, None).
+AuditWrite = Tuple[str, str, Optional[Dict[str, Any]]]
 
-def _ensure_file() -> None:
-    if not _STORAGE_FILE.exists():
-        _STORAGE_FILE.write_text("[]", encoding="utf-8")
 
+# Время операций с хранилищем: операция -> [число вызовов, суммарные секунды].
+_timings: DefaultDict[str, List[float]] = defaultdict(lambda: [0, 0.0])
+_timings_lock = threading.Lock()
 
-def load_audits() -> List[Dict[str, Any]]:
-    _ensure_file()
+
+@contextmanager
+def _timed(operation: str) -> Iterator[None]:
+    started = time.perf_counter()
     try:
-        data = json.loads(_STORAGE_FILE.read_text(encoding="utf-8"))
-    except json.JSONDecodeError:
-        data = []
-    if not isinstance(data, list):
-        data = []
-    return deepcopy(data)
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        with _timings_lock:
+            entry = _timings[operation]
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+def _create_backend():
+    config = get_config()
+    if config.audit_storage_backend == "sqlite":
+        return SQLiteAuditStore(Path(config.audit_db_path), legacy_json=Path(config.audit_json_path))
+    return AuditLog(Path(config.audit_json_path))
+
+
+class _AuditCache:
+    """
+    Кэш заявок на уровне процесса.
+
+    Держит заявки в памяти (read-only представления MappingProxyType): по ним
+    писатель проверяет и дополняет изменения, а агрегаты статистики ведутся без
+    обхода хранилища. Записи проходят сквозь кэш (write-through), а внешние
+    изменения хранилища ловятся по `backend.signature()`. Чтение заявок идёт
+    мимо кэша — страницами из хранилища (`page_audits`, `iter_audits`).
+    """
+
+    def __init__(self, backend) -> None:
+        self._backend = backend
+        self.lock = threading.RLock()
+        self._items: Optional[Dict[str, Mapping[str, Any]]] = None
+        self._stats = AuditStats()
+        self._signature: Any = None
+        # Готовая сводка для экрана статистики и то, из чего она посчитана.
+        self._aggregates_key: Optional[Tuple[Any, ...]] = None
+        self._aggregates: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self) -> Dict[str, Mapping[str, Any]]:
+        signature = self._backend.signature()
+        if self._items is not None and signature == self._signature:
+            self.hits += 1
+            return self._items
+        self.misses += 1
+        with _timed("load"):
+            records = self._backend.load()
+        self._items = {record["id"]: MappingProxyType(record) for record in records}
+        # Полный пересчёт только при (пере)загрузке; дальше агрегаты ведут записи.
+        self._stats = AuditStats(self._items.values())
+        self._signature = signature
+        return self._items
+
+    def apply(self, writes: Sequence[AuditWrite]) -> List[Any]:
+        """
+        Применяет пачку изменений одним коммитом хранилища и возвращает результат
+        каждого: id новой заявки, разобранную заявку (или None) и флаг удаления.
+        Проверки (`resolve` только открытой заявки) идут по очереди внутри пачки.
+        """
+        with self.lock:
+            items = self._fresh()
+            staged: Dict[str, Optional[Mapping[str, Any]]] = {}
+            commands: List[Tuple[str, str, Optional[Dict[str, Any]]]] = []
+            results: List[Any] = []
+            for op, key, payload in writes:
+                current = staged[key] if key in staged else items.get(key)
+                if op == "save":
+                    staged[key] = MappingProxyType(payload)
+                    commands.append(("insert", key, payload))
+                    results.append(key)
+                elif op == "resolve" and current is not None and current.get("status") != "resolved":
+                    updated = {**current, **payload, "id": key}
+                    staged[key] = MappingProxyType(updated)
+                    commands.append(("replace", key, updated))
+                    results.append(staged[key])
+                elif op == "remove" and current is not None:
+                    staged[key] = None
+                    commands.append(("delete", key, None))
+                    results.append(True)
+                else:
+                    results.append(None if op == "resolve" else False)
+
+            if commands:
+                with _timed("commit"):
+                    self._backend.write_batch(commands)
+            for op, key, record in commands:
+                previous = items.pop(key, None) if op == "delete" else items.get(key)
+                if op != "delete":
+                    items[key] = MappingProxyType(record)
+                if previous is not None:
+                    self._stats.remove(previous)
+                if op != "delete":
+                    self._stats.add(items[key])
+            self._signature = self._backend.signature()
+            return results
+
+    def aggregates(self, days: int, archived: Optional[AuditStats] = None) -> Dict[str, Any]:
+        with self.lock:
+            self._fresh()
+            # Сумма с архивом, сортировки и медиана пересчитываются, только когда
+            # изменилась одна из сводок; повторный показ статистики — O(1).
+            key = (self._stats, self._stats.version, archived, archived.version if archived else None, days)
+            if key != self._aggregates_key:
+                stats = self._stats if archived is None else self._stats.merged(archived)
+                self._aggregates, self._aggregates_key = stats.snapshot(days), key
+            return dict(self._aggregates)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._items) if self._items is not None else 0,
+            }
+
+
+_backend = _create_backend()
+_cache = _AuditCache(_backend)
+_archive = AuditArchive(Path(get_config().audit_archive_dir))
+
+
 
 
-def _write_audits(audits: List[Dict[str, Any]]) -> None:
-    _STORAGE_FILE.write_text(json.dumps(audits, ensure_ascii=False, indent=2), encoding="utf-8")
+def iter_audits(filters: AuditFilter = NO_FILTER, page_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Заявки по фильтру — сначала архив (по месяцам), затем хранилище в порядке
+    поступления. Читается постранично, минуя кэш, чтобы выгрузка большой истории
+    не держала её целиком в памяти.
+    """
+    for page in _archive.scan(filters, page_size):
+        yield from page
+    for page in _backend.scan(filters, page_size):
+        yield from page
 
 
-def save_audit(audit: Dict[str, Any]) -> None:
-    audits = load_audits()
+def page_audits(
+    filters: AuditFilter = NO_FILTER,
+    limit: int = 5,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+) -> AuditPage:
+    """
+    Страница заявок по фильтру, новые первыми. Без курсоров — самая свежая;
+    `before=page.oldest` — следующая (старше), `after=page.newest` — предыдущая.
+    Читается ровно одна страница (плюс одна заявка, чтобы понять, есть ли дальше).
+    """
+    limit = max(limit, 1)
+    epoch = _backend.cursor_epoch()
+    with _timed("page"):
+        rows = _backend.page(filters, limit + 1, before=before, after=after)
+    if after is not None:
+        has_more, rows = len(rows) > limit, rows[-limit:]
+        has_newer, has_older = has_more, True
+    else:
+        has_more, rows = len(rows) > limit, rows[:limit]
+        has_newer, has_older = before is not None, has_more
+    if not rows:
+        return AuditPage(has_newer=before is not None, has_older=after is not None, epoch=epoch)
+    return AuditPage(
+        records=[record for _, record in rows],
+        newest=rows[0][0],
+        oldest=rows[-1][0],
+        has_newer=has_newer,
+        has_older=has_older,
+        epoch=epoch,
+    )
+
+
+def audit_cursor_epoch() -> str:
+    """Эпоха курсоров `page_audits`; сохранённые курсоры другой эпохи надо сбросить."""
+    return _backend.cursor_epoch()
+
+
+
+
+def get_audit_stats(days: int = 7) -> Dict[str, Any]:
+    """
+    Сводка для экрана статистики: всего, открытые/разобранные, разбивка по типу
+    и цели, заявки за последние `days` дней, медиана времени до разбора (минуты).
+    Агрегаты ведутся на каждой записи, поэтому вызов не зависит от размера истории.
+    Архив учитывается по своей сохранённой сводке.
+    """
+    return _cache.aggregates(days, archived=_archive.stats())
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Счётчики попаданий/промахов кэша заявок."""
+    return _cache.stats()
+
+
+def get_storage_timings() -> Dict[str, Tuple[int, float]]:
+    """
+    Число вызовов и суммарное время (секунды) операций с хранилищем:
+    `load` — полная загрузка в кэш, `commit` — запись пачки, `page` — страница админки.
+    """
+    with _timings_lock:
+        return {operation: (int(count), total) for operation, (count, total) in _timings.items()}
+
+
+def _prepare_audit(audit: Dict[str, Any]) -> Dict[str, Any]:
     payload = deepcopy(audit)
+    payload["id"] = str(payload.get("id") or uuid.uuid4().hex)
     payload.setdefault("timestamp", datetime.utcnow().isoformat())
-    audits.append(payload)
-    _write_audits(audits)
+    payload.setdefault("status", "open")
+    return payload
+
+
+def _resolution() -> Dict[str, Any]:
+    return {"status": "resolved", "resolved_at": datetime.utcnow().isoformat()}
+
+
+
+
+
+class AuditWriter:
+    """
+    Единственный асинхронный писатель заявок (групповой коммит).
+
+    Изменения из обработчиков встают в очередь; воркер ждёт `commit_window`
+    секунд, забирает всё, что успело прийти, и фиксирует пачку одним fsync
+    (или одной транзакцией SQLite). Каждый вызывающий получает свой future.
+    Если пачка не записалась, изменения повторяются по одному, чтобы ошибка
+    одной заявки не утянула остальные.
+    """
+
+    def __init__(self, cache: _AuditCache, commit_window: float = 0.005, max_batch: int = 100) -> None:
+        self._cache = cache
+        self._commit_window = commit_window
+        self._max_batch = max_batch
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def submit(self, write: AuditWrite) -> asyncio.Future:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((write, future))
+        return future
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дожидается записи очереди (не дольше `timeout`) и останавливает воркер."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.error("Audit writes left uncommitted: %s", self._queue.qsize())
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = await collect_batch(self._queue, self._commit_window, self._max_batch)
+            try:
+                await self._commit(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _commit(self, batch: List[Tuple[AuditWrite, asyncio.Future]]) -> None:
+        try:
+            results = await asyncio.to_thread(self._cache.apply, [write for write, _ in batch])
+        except Exception as exc:  # noqa: BLE001
+            if len(batch) == 1:
+                _settle(batch[0][1], error=exc)
+                return
+            logging.exception("Group commit of %s audit writes failed; retrying one by one.", len(batch))
+            for write, future in batch:
+                try:
+                    (result,) = await asyncio.to_thread(self._cache.apply, [write])
+                except Exception as exc:  # noqa: BLE001
+                    _settle(future, error=exc)
+                else:
+                    _settle(future, result)
+            return
+        for (_, future), result in zip(batch, results):
+            _settle(future, result)
+
+
+def _settle(future: asyncio.Future, result: Any = None, error: Optional[BaseException] = None) -> None:
+    # Вызывающий мог не дождаться (отмена апдейта) — запись всё равно уже сделана.
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+_writer: Optional[AuditWriter] = None
+
+
+def _get_writer() -> AuditWriter:
+    global _writer
+    if _writer is None:
+        _writer = AuditWriter(_cache, commit_window=get_config().audit_commit_window_ms / 1000)
+    return _writer
+
+
+def submit_save_audit(audit: Dict[str, Any]) -> "asyncio.Future[str]":
+    """Ставит заявку в очередь единственного писателя; future вернёт её id после коммита."""
+    payload = _prepare_audit(audit)
+    return _get_writer().submit(("save", payload["id"], payload))
+
+
+def submit_resolve_audit(audit_id: str) -> "asyncio.Future[Optional[Mapping[str, Any]]]":
+    """Как `resolve_audit`, но через писателя: future вернёт заявку или None."""
+    return _get_writer().submit(("resolve", audit_id, _resolution()))
+
+
+def submit_remove_audit(audit_id: str) -> "asyncio.Future[bool]":
+    return _get_writer().submit(("remove", audit_id, None))
+
+
+def _archivable(cutoff: str, limit: int) -> List[Dict[str, Any]]:
+    return [
+        dict(record)
+        for record in islice(
+            (
+                record
+                for record in _cache.records()
+                if record.get("status") == "resolved" and (record.get("resolved_at") or "") < cutoff
+            ),
+            limit,
+        )
+    ]
+
+
+async def archive_resolved_audits(older_than: timedelta, limit: int = 1000) -> int:
+    """
+    Переносит разобранные заявки старше `older_than` в архив и убирает их из
+    хранилища через писателя. Сначала архив (с fsync), потом удаление: если
+    процесс упадёт между ними, повторный запуск не создаст в архиве дублей.
+    """
+    cutoff = (datetime.utcnow() - older_than).isoformat()
+    records = await asyncio.to_thread(_archivable, cutoff, limit)
+    if not records:
+        return 0
+    archived = await asyncio.to_thread(_archive.store, records)
+    removed = await asyncio.gather(*(submit_remove_audit(audit_id) for audit_id in archived))
+    return sum(1 for ok in removed if ok)
+
+
+def audit_writer_pending() -> int:
+    """Сколько изменений ждёт группового коммита."""
+    return _writer.pending if _writer is not None else 0
 
 
-def remove_audit(index: int) -> None:
-    audits = load_audits()
-    if 0 <= index < len(audits):
-        audits.pop(index)
-        _write_audits(audits)
+async def stop_audit_writer(timeout: float = 10.0) -> None:
+    global _writer
+    if _writer is not None:
+        await _writer.stop(timeout)
+        _writer = None
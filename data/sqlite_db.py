@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+
+
+def connect_sqlite(db_path: Path, schema: str = "", synchronous: str = "NORMAL") -> sqlite3.Connection:
+    """
+    Соединение с базой хранилища: WAL (чтение не ждёт записи), доступ из потоков
+    `asyncio.to_thread` под блокировкой самого хранилища и при необходимости схема.
+
+    `synchronous=NORMAL` в режиме WAL при отключении питания может потерять
+    последние транзакции, но не портит базу; где терять нельзя — передают `FULL`.
+    """
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    if schema:
+        conn.executescript(schema)
+    return conn
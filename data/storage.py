@@ -1,17 +1,171 @@
 from __future__ import annotations
 
-from typing import Dict, Iterable, Optional
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 
+from data.config import get_config
+from data.sqlite_db import connect_sqlite
 
-_known_users: Dict[int, str] = {}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL DEFAULT '',
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    blocked INTEGER NOT NULL DEFAULT 0,
+    blocked_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_active ON users(blocked, user_id);
+"""
+
+_UPSERT_USER = """
+INSERT INTO users (user_id, username, first_seen, last_seen) VALUES (?, ?, ?, ?)
+ON CONFLICT(user_id) DO UPDATE SET
+    username = CASE WHEN excluded.username != '' THEN excluded.username ELSE users.username END,
+    last_seen = excluded.last_seen,
+    blocked = 0,
+    blocked_at = NULL
+"""
+_MARK_BLOCKED = "UPDATE users SET blocked = 1, blocked_at = ? WHERE user_id = ?"
+_COUNT_ACTIVE = "SELECT COUNT(*) FROM users WHERE blocked = 0"
+
+
+def init_user_schema(conn: sqlite3.Connection) -> None:
+    """Создаёт таблицу users, если её ещё нет; нужна и заданиям рассылки из той же базы."""
+    conn.executescript(_SCHEMA)
+
+
+class UserRegistry:
+    """
+    Постоянный реестр пользователей для рассылок (SQLite).
+
+    `register` копит изменения в памяти и сбрасывает их пачкой — по размеру
+    буфера или по времени, — так что частые /start не превращаются в поток
+    мелких транзакций. Вызывается из обработчиков прямо в event loop, поэтому
+    сам в базу не ходит: сброс уходит в пул потоков. Буфер и база защищены
+    разными блокировками — запись рассылки в базу не задерживает `register`.
+    Чтение всегда сначала досбрасывает буфер.
+    """
+
+    def __init__(self, db_path: Path, batch_size: int = 50, flush_interval: float = 5.0) -> None:
+        self._db_path = db_path
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: Dict[int, Tuple[str, str]] = {}
+        self._last_flush = time.monotonic()
+        self._flush_scheduled = False
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = connect_sqlite(self._db_path)
+            init_user_schema(conn)
+            self._conn = conn
+        return self._conn
+
+    def _flush_locked(self) -> None:
+        with self._buffer_lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        rows = [(user_id, username, seen_at, seen_at) for user_id, (username, seen_at) in pending.items()]
+        try:
+            conn = self._connection()
+            with conn:
+                conn.executemany(_UPSERT_USER, rows)
+        except Exception:
+            # Не потеряли: вернём в буфер, более свежие визиты тех же пользователей важнее.
+            with self._buffer_lock:
+                for user_id, entry in pending.items():
+                    self._pending.setdefault(user_id, entry)
+            raise
+
+    def register(self, user_id: int, username: Optional[str]) -> None:
+        seen_at = datetime.utcnow().isoformat()
+        with self._buffer_lock:
+            previous = self._pending.get(user_id)
+            handle = username or (previous[0] if previous else "")
+            self._pending[user_id] = (handle, seen_at)
+            overdue = time.monotonic() - self._last_flush >= self._flush_interval
+            due = (len(self._pending) >= self._batch_size or overdue) and not self._flush_scheduled
+            if due:
+                self._flush_scheduled = True
+        if due:
+            self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._background_flush()
+            return
+        loop.run_in_executor(None, self._background_flush)
+
+    def _background_flush(self) -> None:
+        try:
+            self.flush()
+        except Exception:  # noqa: BLE001
+            logging.exception("Failed to flush user registry")
+        finally:
+            with self._buffer_lock:
+                self._flush_scheduled = False
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def mark_blocked(self, user_id: int) -> None:
+        """Помечает пользователя недоступным (заблокировал бота / удалён) — рассылки его пропускают."""
+        with self._lock:
+            self._flush_locked()
+            conn = self._connection()
+            with conn:
+                conn.execute(_MARK_BLOCKED, (datetime.utcnow().isoformat(), user_id))
+
+    def count_active(self) -> int:
+        with self._lock:
+            self._flush_locked()
+            (total,) = self._connection().execute(_COUNT_ACTIVE).fetchone()
+        return total
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_registry = UserRegistry(Path(get_config().users_db_path))
 
 
 def register_user(user_id: Optional[int], username: Optional[str] = None) -> None:
     if user_id is None:
         return
-    handle = username or _known_users.get(user_id) or ""
-    _known_users[user_id] = handle
+    _registry.register(user_id, username)
+
+
+def mark_user_blocked(user_id: int) -> None:
+    _registry.mark_blocked(user_id)
+
+
+def count_recipients() -> int:
+    return _registry.count_active()
+
+
+def flush_users() -> None:
+    _registry.flush()
 
 
-def get_known_user_ids() -> Iterable[int]:
-    return list(_known_users.keys())
+def close_user_registry() -> None:
+    _registry.close()
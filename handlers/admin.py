@@ -1,26 +1,30 @@
 import asyncio
+import html
 import logging
-from datetime import datetime
-from typing import List, Tuple
+import shlex
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 from aiogram import F, Router
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
-from aiogram.types import CallbackQuery, Message
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, FSInputFile, InlineKeyboardButton, InlineKeyboardMarkup, Message
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from data.config import get_config
-from data.local_storage import load_audits, remove_audit
-from data.storage import get_known_user_ids, register_user
+from data.audit_query import AuditFilter, AuditPage
+from data.local_storage import audit_cursor_epoch, get_audit_stats, page_audits, submit_resolve_audit
+from data.storage import count_recipients, register_user
+from handlers.audit import AUDIT_OPTIONS, GOAL_OPTIONS
+from utils.admin_acl import AdminMiddleware, reload_admin_acl
+from utils.broadcast import start_broadcast
+from utils.export import EXPORT_FORMATS, export_audits
 from utils.keyboard import main_menu_keyboard
 
 
 router = Router()
 
-_CONFIG = get_config()
-_ADMIN_USERNAME = (_CONFIG.admin_username or "").lstrip("@").lower()
-
 ADMIN_MENU_REQUESTS = "admin:requests"
 ADMIN_MENU_STATS = "admin:stats"
 ADMIN_MENU_BROADCAST = "admin:broadcast"
@@ -28,6 +32,18 @@ ADMIN_MENU_BACK = "admin:back"
 ADMIN_BROADCAST_CONFIRM = "admin:broadcast_confirm"
 ADMIN_BROADCAST_CANCEL = "admin:broadcast_cancel"
 ADMIN_RESOLVE_PREFIX = "admin:resolve:"
+ADMIN_PAGE_NEWER = "admin:page:newer"
+ADMIN_PAGE_OLDER = "admin:page:older"
+ADMIN_FILTER_PREFIX = "admin:filter:"
+
+BROWSER_PAGE_SIZE = 5
+BROWSER_STATE_KEY = "audit_browser"
+_STATUS_LABELS = {"open": "открытые", "resolved": "разобранные", None: "все"}
+_FILTER_OPTIONS: Dict[str, Sequence[Optional[str]]] = {
+    "status": ("open", "resolved", None),
+    "audit_type": AUDIT_OPTIONS,
+    "goal": GOAL_OPTIONS,
+}
 
 
 class AdminBroadcastStates(StatesGroup):
@@ -35,7 +51,12 @@ class AdminBroadcastStates(StatesGroup):
     waiting_for_confirmation = State()
 
 
-def admin_menu_keyboard():
+# Доступ проверяется один раз для любого обработчика этого маршрутизатора.
+router.message.middleware(AdminMiddleware(AdminBroadcastStates))
+router.callback_query.middleware(AdminMiddleware(AdminBroadcastStates))
+
+
+def _build_admin_menu_keyboard() -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text="📋 Заявки", callback_data=ADMIN_MENU_REQUESTS)
     builder.button(text="📊 Статистика", callback_data=ADMIN_MENU_STATS)
@@ -45,11 +66,42 @@ def admin_menu_keyboard():
     return builder.as_markup()
 
 
-def _is_authorized(username: str | None) -> bool:
-    if not _ADMIN_USERNAME:
-        logging.warning("ADMIN_USERNAME is not configured; denying admin access.")
-        return False
-    return (username or "").lower() == _ADMIN_USERNAME
+_ADMIN_MENU_KEYBOARD = _build_admin_menu_keyboard()
+
+
+def admin_menu_keyboard() -> InlineKeyboardMarkup:
+    return _ADMIN_MENU_KEYBOARD
+
+
+EXPORT_USAGE = (
+    "Формат: /export [csv|jsonl] [from=ГГГГ-ММ-ДД] [to=ГГГГ-ММ-ДД] "
+    '[type="Telegram Ads"] [goal=Продажи] [status=open|resolved]'
+)
+_EXPORT_FILTER_KEYS = {"from": "since", "to": "until", "type": "audit_type", "goal": "goal", "status": "status"}
+
+
+def _parse_export_args(args: Optional[str]) -> Tuple[str, AuditFilter]:
+    fmt = "csv"
+    fields: Dict[str, str] = {}
+    for token in shlex.split(args or ""):
+        key, sep, value = token.partition("=")
+        if not sep:
+            if token.lower() not in EXPORT_FORMATS:
+                raise ValueError(token)
+            fmt = token.lower()
+            continue
+        if key.lower() not in _EXPORT_FILTER_KEYS or not value:
+            raise ValueError(token)
+        fields[_EXPORT_FILTER_KEYS[key.lower()]] = value
+
+    for bound in ("since", "until"):
+        if bound in fields:
+            day = datetime.strptime(fields[bound], "%Y-%m-%d")
+            # «to» включает весь указанный день.
+            if bound == "until":
+                day += timedelta(days=1)
+            fields[bound] = day.strftime("%Y-%m-%d")
+    return fmt, AuditFilter(**fields)
 
 
 def _format_timestamp(raw: str) -> str:
@@ -60,79 +112,216 @@ def _format_timestamp(raw: str) -> str:
     return dt.strftime("%d.%m %H:%M")
 
 
-async def _load_recent_audits(limit: int = 5) -> List[Tuple[int, dict]]:
-    audits = await asyncio.to_thread(load_audits)
-    indexed = list(enumerate(audits))
-    recent = indexed[-limit:]
-    recent.reverse()
-    return recent
+def _format_day(day: str) -> str:
+    try:
+        return datetime.strptime(day, "%Y-%m-%d").strftime("%d.%m")
+    except ValueError:
+        return day
 
 
-@router.message(Command("admin"))
-async def admin_entry(message: Message, state: FSMContext) -> None:
-    if not _is_authorized(message.from_user.username):
-        await message.answer("⛔ Доступ запрещён.")
-        return
+def _cycle(options: Sequence[Optional[str]], current: Optional[str]) -> Optional[str]:
+    options = (*options, None) if None not in options else tuple(options)
+    index = options.index(current) if current in options else -1
+    return options[(index + 1) % len(options)]
 
-    register_user(message.from_user.id, message.from_user.username)
-    await state.clear()
-    await message.answer("Привет! Что делаем дальше?", reply_markup=admin_menu_keyboard())
 
+def _escaped(value: Any) -> str:
+    # parse_mode=HTML по умолчанию: `<` или `&` из заявки иначе ломает всю страницу.
+    return html.escape(str(value))
 
-@router.callback_query(F.data == ADMIN_MENU_REQUESTS)
-async def show_recent_requests(callback: CallbackQuery) -> None:
-    if not _is_authorized(callback.from_user.username):
-        await callback.answer("⛔ Нет доступа.", show_alert=True)
-        return
 
-    await callback.answer()
-    recent = await _load_recent_audits()
+def _browser_filter(browser: Dict[str, Any]) -> AuditFilter:
+    return AuditFilter(
+        audit_type=browser.get("audit_type"),
+        goal=browser.get("goal"),
+        status=browser.get("status"),
+    )
 
-    if not recent:
-        await callback.message.answer("Нет новых заявок 👌", reply_markup=admin_menu_keyboard())
-        return
 
-    lines = ["📋 Последние заявки:"]
+async def _load_page(browser: Dict[str, Any], before: Optional[int] = None, after: Optional[int] = None) -> AuditPage:
+    return await asyncio.to_thread(page_audits, _browser_filter(browser), BROWSER_PAGE_SIZE, before, after)
+
+
+def _render_page(browser: Dict[str, Any], page: AuditPage) -> Tuple[str, InlineKeyboardMarkup]:
+    lines = [
+        "📋 Заявки\n"
+        f"Статус: {_STATUS_LABELS[browser.get('status')]} · "
+        f"Тип: {_escaped(browser.get('audit_type') or 'все')} · "
+        f"Цель: {_escaped(browser.get('goal') or 'все')}"
+    ]
     keyboard = InlineKeyboardBuilder()
 
-    for index, entry in recent:
+    if not page.records:
+        lines.append("Нет заявок по этому фильтру 👌")
+    for entry in page.records:
         timestamp = _format_timestamp(entry.get("timestamp", ""))
         username = entry.get("username") or "Без ника"
         audit_type = entry.get("audit_type") or "—"
         goal = entry.get("goal") or "—"
         link = entry.get("link") or "—"
+        resolved = entry.get("status") == "resolved"
         lines.append(
-            f"{timestamp} — {username}\n"
-            f"Тип: {audit_type}\n"
-            f"Цель: {goal}\n"
-            f"Ссылка: {link}"
+            f"{'✅ ' if resolved else ''}{timestamp} — {_escaped(username)}\n"
+            f"Тип: {_escaped(audit_type)}\n"
+            f"Цель: {_escaped(goal)}\n"
+            f"Ссылка: {_escaped(link)}"
         )
-        keyboard.button(
-            text=f"✅ Разобрано — {username}",
-            callback_data=f"{ADMIN_RESOLVE_PREFIX}{index}",
+        if not resolved:
+            keyboard.row(
+                InlineKeyboardButton(
+                    text=f"✅ Разобрано — {username}",
+                    callback_data=f"{ADMIN_RESOLVE_PREFIX}{entry['id']}",
+                )
+            )
+
+    navigation = []
+    if page.has_newer:
+        navigation.append(InlineKeyboardButton(text="◀️ Новее", callback_data=ADMIN_PAGE_NEWER))
+    if page.has_older:
+        navigation.append(InlineKeyboardButton(text="Старее ▶️", callback_data=ADMIN_PAGE_OLDER))
+    if navigation:
+        keyboard.row(*navigation)
+    keyboard.row(
+        InlineKeyboardButton(text="Статус", callback_data=f"{ADMIN_FILTER_PREFIX}status"),
+        InlineKeyboardButton(text="Тип", callback_data=f"{ADMIN_FILTER_PREFIX}audit_type"),
+        InlineKeyboardButton(text="Цель", callback_data=f"{ADMIN_FILTER_PREFIX}goal"),
+    )
+    keyboard.row(InlineKeyboardButton(text="🔙 Назад", callback_data=ADMIN_MENU_BACK))
+    return "\n\n".join(lines), keyboard.as_markup()
+
+
+async def _show_page(callback: CallbackQuery, state: FSMContext, browser: Dict[str, Any], page: AuditPage) -> None:
+    """Страница рисуется в том же сообщении; курсоры живут в данных FSM админа."""
+    browser = {**browser, "newest": page.newest, "oldest": page.oldest, "epoch": page.epoch}
+    await state.update_data({BROWSER_STATE_KEY: browser})
+    text, markup = _render_page(browser, page)
+    try:
+        await callback.message.edit_text(text, reply_markup=markup)
+    except TelegramBadRequest as exc:
+        if "message is not modified" not in str(exc):
+            raise
+
+
+async def _current_browser(state: FSMContext) -> Dict[str, Any]:
+    data = await state.get_data()
+    browser = dict(data.get(BROWSER_STATE_KEY) or {"status": "open"})
+    # Курсоры лежат в FSM и переживают перезапуск, а номера JSON-хранилища — нет:
+    # курсоры прошлой эпохи сбрасываем, листание начнётся с самых свежих.
+    if browser.get("epoch") != await asyncio.to_thread(audit_cursor_epoch):
+        browser.pop("newest", None)
+        browser.pop("oldest", None)
+    return browser
+
+
+@router.message(Command("admin"))
+async def admin_entry(message: Message, state: FSMContext) -> None:
+    register_user(message.from_user.id, message.from_user.username)
+    await state.clear()
+    await message.answer("Привет! Что делаем дальше?", reply_markup=admin_menu_keyboard())
+
+
+@router.message(Command("admin_reload"))
+async def reload_admins(message: Message) -> None:
+    admin_ids = reload_admin_acl()
+    logging.info("Admin ACL reloaded by %s: %s", message.from_user.id, sorted(admin_ids))
+    await message.answer(f"Список админов обновлён: {len(admin_ids)} id.")
+
+
+@router.message(Command("export"))
+async def export_requests(message: Message, command: CommandObject) -> None:
+    try:
+        fmt, filters = _parse_export_args(command.args)
+    except ValueError:
+        await message.answer(EXPORT_USAGE)
+        return
+
+    path, count = await asyncio.to_thread(export_audits, fmt, filters)
+    try:
+        if not count:
+            await message.answer("Нет заявок по этому фильтру.")
+            return
+        filename = f"audits-{datetime.utcnow():%Y%m%d-%H%M}.{fmt}"
+        await message.answer_document(
+            FSInputFile(path, filename=filename),
+            caption=f"📤 Заявок в выгрузке: {count}",
         )
+    finally:
+        path.unlink(missing_ok=True)
+
+
+@router.callback_query(F.data == ADMIN_MENU_REQUESTS)
+async def show_recent_requests(callback: CallbackQuery, state: FSMContext) -> None:
+    await callback.answer()
+    browser = {"status": "open"}
+    await _show_page(callback, state, browser, await _load_page(browser))
+
+
+@router.callback_query(F.data == ADMIN_PAGE_NEWER)
+@router.callback_query(F.data == ADMIN_PAGE_OLDER)
+async def turn_requests_page(callback: CallbackQuery, state: FSMContext) -> None:
+    browser = await _current_browser(state)
+    if callback.data == ADMIN_PAGE_OLDER and browser.get("oldest") is not None:
+        page = await _load_page(browser, before=browser["oldest"])
+    elif callback.data == ADMIN_PAGE_NEWER and browser.get("newest") is not None:
+        page = await _load_page(browser, after=browser["newest"])
+    else:
+        page = await _load_page(browser)
+
+    if not page.records:
+        await callback.answer("Дальше заявок нет.")
+        return
+    await callback.answer()
+    await _show_page(callback, state, browser, page)
 
-    keyboard.button(text="🔙 Назад", callback_data=ADMIN_MENU_BACK)
-    keyboard.adjust(1)
 
-    await callback.message.answer("\n\n".join(lines), reply_markup=keyboard.as_markup())
+@router.callback_query(F.data.startswith(ADMIN_FILTER_PREFIX))
+async def change_requests_filter(callback: CallbackQuery, state: FSMContext) -> None:
+    field = callback.data[len(ADMIN_FILTER_PREFIX) :]
+    options = _FILTER_OPTIONS.get(field)
+    if options is None:
+        await callback.answer()
+        return
+
+    browser = await _current_browser(state)
+    browser[field] = _cycle(options, browser.get(field))
+    await callback.answer()
+    # Новый фильтр — снова с самых свежих заявок.
+    await _show_page(callback, state, browser, await _load_page(browser))
+
+
+def _format_duration(minutes: Optional[float]) -> str:
+    if minutes is None:
+        return "—"
+    if minutes < 60:
+        return f"{minutes:.0f} мин"
+    if minutes < 24 * 60:
+        return f"{minutes / 60:.1f} ч"
+    return f"{minutes / (24 * 60):.1f} дн"
+
+
+def _format_breakdown(counts: Dict[str, int]) -> str:
+    return "\n".join(f"  • {_escaped(key)}: {hits}" for key, hits in counts.items()) or "  —"
 
 
 @router.callback_query(F.data == ADMIN_MENU_STATS)
 async def show_stats(callback: CallbackQuery) -> None:
-    if not _is_authorized(callback.from_user.username):
-        await callback.answer("⛔ Нет доступа.", show_alert=True)
-        return
-
     await callback.answer()
-    audits = await asyncio.to_thread(load_audits)
-    recipients = list(get_known_user_ids())
+    stats = await asyncio.to_thread(get_audit_stats)
+    recipients = await asyncio.to_thread(count_recipients)
+    by_day = "\n".join(
+        f"  • {_format_day(day)}: {hits}" for day, hits in stats["by_day"].items()
+    ) or "  —"
 
     text = (
         "📊 Статистика:\n"
-        f"📥 Всего заявок: {len(audits)}\n"
-        f"📬 В очереди: {len(audits)}\n"
-        f"👥 Пользователей для рассылки: {len(recipients)}"
+        f"📥 Всего заявок: {stats['total']}\n"
+        f"📬 В очереди: {stats['open']}\n"
+        f"✅ Разобрано: {stats['resolved']}\n"
+        f"⏱ Медиана до разбора: {_format_duration(stats['median_resolve_minutes'])}\n"
+        f"👥 Пользователей для рассылки: {recipients}\n\n"
+        f"По типу:\n{_format_breakdown(stats['by_type'])}\n\n"
+        f"По цели:\n{_format_breakdown(stats['by_goal'])}\n\n"
+        f"По дням:\n{by_day}"
     )
 
     await callback.message.answer(text, reply_markup=admin_menu_keyboard())
@@ -140,10 +329,6 @@ async def show_stats(callback: CallbackQuery) -> None:
 
 @router.callback_query(F.data == ADMIN_MENU_BROADCAST)
 async def prompt_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
-    if not _is_authorized(callback.from_user.username):
-        await callback.answer("⛔ Нет доступа.", show_alert=True)
-        return
-
     await callback.answer()
     await state.set_state(AdminBroadcastStates.waiting_for_text)
     await callback.message.answer("Введите текст рассылки.")
@@ -151,25 +336,17 @@ async def prompt_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
 
 @router.message(AdminBroadcastStates.waiting_for_text)
 async def receive_broadcast_text(message: Message, state: FSMContext) -> None:
-    if not _is_authorized(message.from_user.username):
-        await message.answer("⛔ Доступ запрещён.")
-        await state.clear()
-        return
-
     if not message.text:
         await message.answer("Нужен текстовый ответ для рассылки.")
         return
 
-    recipients = list(get_known_user_ids())
+    recipients = await asyncio.to_thread(count_recipients)
     if not recipients:
         await message.answer("Нет получателей для рассылки.")
         await state.clear()
         return
 
-    await state.update_data(
-        broadcast_text=message.text,
-        recipients=recipients,
-    )
+    await state.update_data(broadcast_text=message.text)
     await state.set_state(AdminBroadcastStates.waiting_for_confirmation)
 
     builder = InlineKeyboardBuilder()
@@ -178,7 +355,7 @@ async def receive_broadcast_text(message: Message, state: FSMContext) -> None:
     builder.adjust(2)
 
     await message.answer(
-        f"Отправить рассылку {len(recipients)} пользователям?",
+        f"Отправить рассылку {recipients} пользователям?",
         reply_markup=builder.as_markup(),
     )
 
@@ -188,17 +365,11 @@ async def receive_broadcast_text(message: Message, state: FSMContext) -> None:
     F.data == ADMIN_BROADCAST_CONFIRM,
 )
 async def confirm_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
-    if not _is_authorized(callback.from_user.username):
-        await callback.answer("⛔ Нет доступа.", show_alert=True)
-        await state.clear()
-        return
-
     await callback.answer()
     data = await state.get_data()
     text = data.get("broadcast_text")
-    recipients = data.get("recipients", [])
 
-    if not text or not recipients:
+    if not text:
         await callback.message.edit_reply_markup()
         await callback.message.answer("Нет данных для рассылки, начните заново.", reply_markup=admin_menu_keyboard())
         await state.clear()
@@ -209,25 +380,10 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
     except Exception:
         pass
 
-    total = len(recipients)
-    sent = 0
-    for index, user_id in enumerate(recipients, start=1):
-        try:
-            await callback.bot.send_message(user_id, text)
-            sent += 1
-        except Exception:  # noqa: BLE001
-            logging.exception("Failed to send broadcast to %s", user_id)
-
-        if index < total:
-            await asyncio.sleep(2)
-            if index % 30 == 0:
-                await asyncio.sleep(60)
-
-    await callback.message.answer(
-        f"✅ Рассылка завершена. Успешно отправлено {sent} / {total}.",
-        reply_markup=admin_menu_keyboard(),
-    )
     await state.clear()
+    job = await start_broadcast(callback.bot, text, callback.message.chat.id)
+    if not job.total:
+        await callback.message.answer("Нет получателей для рассылки.", reply_markup=admin_menu_keyboard())
 
 
 @router.callback_query(
@@ -235,11 +391,6 @@ async def confirm_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
     F.data == ADMIN_BROADCAST_CANCEL,
 )
 async def cancel_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
-    if not _is_authorized(callback.from_user.username):
-        await callback.answer("⛔ Нет доступа.", show_alert=True)
-        await state.clear()
-        return
-
     await callback.answer("Отменено.")
     try:
         await callback.message.edit_reply_markup()
@@ -250,57 +401,24 @@ async def cancel_broadcast(callback: CallbackQuery, state: FSMContext) -> None:
 
 
 @router.callback_query(F.data.startswith(ADMIN_RESOLVE_PREFIX))
-async def resolve_request(callback: CallbackQuery) -> None:
-    if not _is_authorized(callback.from_user.username):
-        await callback.answer("⛔ Нет доступа.", show_alert=True)
-        return
-
-    payload = callback.data[len(ADMIN_RESOLVE_PREFIX) :]
-    try:
-        index = int(payload)
-    except ValueError:
+async def resolve_request(callback: CallbackQuery, state: FSMContext) -> None:
+    audit_id = callback.data[len(ADMIN_RESOLVE_PREFIX) :]
+    if not audit_id:
         await callback.answer()
         return
 
-    await asyncio.to_thread(remove_audit, index)
-    await callback.answer("Готово!")
-
-    recent = await _load_recent_audits()
-    if not recent:
-        await callback.message.edit_text("Нет новых заявок 👌", reply_markup=admin_menu_keyboard())
-        return
-
-    lines = ["📋 Последние заявки:"]
-    keyboard = InlineKeyboardBuilder()
-    for idx, entry in recent:
-        timestamp = _format_timestamp(entry.get("timestamp", ""))
-        username = entry.get("username") or "Без ника"
-        audit_type = entry.get("audit_type") or "—"
-        goal = entry.get("goal") or "—"
-        link = entry.get("link") or "—"
-        lines.append(
-            f"{timestamp} — {username}\n"
-            f"Тип: {audit_type}\n"
-            f"Цель: {goal}\n"
-            f"Ссылка: {link}"
-        )
-        keyboard.button(
-            text=f"✅ Разобрано — {username}",
-            callback_data=f"{ADMIN_RESOLVE_PREFIX}{idx}",
-        )
+    resolved = await submit_resolve_audit(audit_id)
+    await callback.answer("Готово!" if resolved else "Заявка уже разобрана.")
 
-    keyboard.button(text="🔙 Назад", callback_data=ADMIN_MENU_BACK)
-    keyboard.adjust(1)
-
-    await callback.message.edit_text("\n\n".join(lines), reply_markup=keyboard.as_markup())
+    # Перерисовываем ту же страницу: с её самой свежей заявки и старше.
+    browser = await _current_browser(state)
+    newest = browser.get("newest")
+    page = await _load_page(browser, before=newest + 1 if newest is not None else None)
+    await _show_page(callback, state, browser, page)
 
 
 @router.callback_query(F.data == ADMIN_MENU_BACK)
 async def admin_back(callback: CallbackQuery, state: FSMContext) -> None:
-    if not _is_authorized(callback.from_user.username):
-        await callback.answer("⛔ Нет доступа.", show_alert=True)
-        return
-
     await callback.answer()
     await state.clear()
     await callback.message.answer(
@@ -1,13 +1,15 @@
-import asyncio
 import logging
+from typing import List
 
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import KeyboardButton, Message, ReplyKeyboardMarkup, ReplyKeyboardRemove
 
-from data.local_storage import save_audit
+from data.local_storage import submit_save_audit
 from data.storage import register_user
+from utils.background import run_in_background
+from utils.notifications import notify_admin
 from utils.scheduler import schedule_follow_up
 
 
@@ -47,18 +49,23 @@ class AuditStates(StatesGroup):
     waiting_for_link = State()
 
 
-def audit_type_keyboard() -> ReplyKeyboardMarkup:
+def _build_options_keyboard(options: List[str]) -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text=option)] for option in AUDIT_OPTIONS],
+        keyboard=[[KeyboardButton(text=option)] for option in options],
         resize_keyboard=True,
     )
 
 
+_AUDIT_TYPE_KEYBOARD = _build_options_keyboard(AUDIT_OPTIONS)
+_GOAL_KEYBOARD = _build_options_keyboard(GOAL_OPTIONS)
+
+
+def audit_type_keyboard() -> ReplyKeyboardMarkup:
+    return _AUDIT_TYPE_KEYBOARD
+
+
 def goal_keyboard() -> ReplyKeyboardMarkup:
-    return ReplyKeyboardMarkup(
-        keyboard=[[KeyboardButton(text=option)] for option in GOAL_OPTIONS],
-        resize_keyboard=True,
-    )
+    return _GOAL_KEYBOARD
 
 
 @router.message(F.text == "🔍 Бесплатный аудит")
@@ -116,39 +123,40 @@ async def process_link(message: Message, state: FSMContext) -> None:
     display_name = f"@{username}" if username else message.from_user.full_name or "Неизвестно"
 
     try:
-        await asyncio.to_thread(
-            save_audit,
+        await submit_save_audit(
             {
                 "user_id": message.from_user.id,
                 "username": display_name,
                 "audit_type": answers["audit_type"],
                 "goal": answers["goal"],
                 "link": answers["link"],
-            },
+            }
         )
     except Exception as exc:  # noqa: BLE001
         logging.exception("Failed to save audit request: %s", exc)
+        # Состояние не сбрасываем: пользователь просто отправит ссылку ещё раз.
+        await message.answer("Не получилось сохранить заявку — попробуй отправить ссылку ещё раз чуть позже.")
+        return
 
-    try:
-        await message.bot.send_message(
-            ADMIN_CONTACT,
-            "🆕 Новая заявка на аудит от {user}\nЦель: {goal}\nСсылка: {link}".format(
-                user=display_name,
-                goal=answers["goal"],
-                link=answers["link"],
-            ),
-        )
-    except Exception as exc:  # noqa: BLE001
-        logging.exception("Failed to notify admin about audit request: %s", exc)
-
-    try:
-        await schedule_follow_up(
+    # Заявка уже на диске: остальное идёт в фоне, параллельно с подтверждением.
+    notify_admin(
+        message.bot,
+        ADMIN_CONTACT,
+        {
+            "user": display_name,
+            "audit_type": answers["audit_type"],
+            "goal": answers["goal"],
+            "link": answers["link"],
+        },
+    )
+    run_in_background(
+        schedule_follow_up(
             bot=message.bot,
             user_id=message.from_user.id,
             username=display_name,
-        )
-    except Exception as exc:  # noqa: BLE001
-        logging.exception("Failed to schedule follow-up for audit request: %s", exc)
+        ),
+        name=f"follow-up:{message.from_user.id}",
+    )
 
     await message.answer(
         AUDIT_CONFIRMED_MESSAGE,
@@ -1,199 +1,109 @@
+from typing import Dict, Optional, Tuple
+
 from aiogram import F, Router
-from aiogram.types import CallbackQuery, Message
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup, Message
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from data.guides import Catalog, GuideSection, get_guides_catalog
 from utils.keyboard import main_menu_keyboard
 
 
 router = Router()
 
-SECTION_BASICS = "guides:basics"
-SECTION_BASICS_BACK = "guides:basics_back"
-SECTION_CASES = "guides:cases"
-SECTION_CASES_BACK = "guides:cases_back"
-SECTION_AUTOMATION = "guides:automation"
-SECTION_AUTOMATION_BACK = "guides:automation_back"
-SECTION_BACK = "guides:back"
-
-SECTION_ITEMS = {
-    "1": [
-        {
-            "label": "1️⃣ Что такое Telegram Ads и почему он не работает",
-            "url": "https://telegra.ph/1-post-1-razdel-10-20",
-        },
-        {
-            "label": "2️⃣ Как выбрать цель кампании и не сжечь бюджет",
-            "url": "https://telegra.ph/2-post-1-razdel-10-20",
-        },
-        {
-            "label": "3️⃣ Пиксель в Telegram: зачем он и как понять, что он вообще работает",
-            "url": "https://telegra.ph/3-post-1-razdel-10-20",
-        },
-        {
-            "label": "4️⃣ Как считать результат рекламы: CTR ≠ прибыль",
-            "url": "https://telegra.ph/4-post-1-razdel-10-20",
-        },
-        {
-            "label": "5️⃣ Рекламный текст, который кликают",
-            "url": "https://telegra.ph/5-post-1-razdel-10-20",
-        },
-        {
-            "label": "6️⃣ Мини-чеклист перед запуском Ads",
-            "url": "https://telegra.ph/6-post-1-razdel-10-20",
-        },
-    ],
-    "2": [
-        {
-            "label": "1️⃣ ТОП-5 ошибок, из-за которых Ads не окупается",
-            "url": "https://telegra.ph/1-post-2-razdel-10-20",
-        },
-        {
-            "label": "2️⃣ Кейс: как я снизил CPL с 480 ₽ до 190 ₽ — по шагам",
-            "url": "https://telegra.ph/2-post-2-razdel-10-20",
-        },
-        {
-            "label": "3️⃣ Почему CTR 15% — это не успех (и что считать вместо него)",
-            "url": "https://telegra.ph/3-post-2-razdel-10-20",
-        },
-        {
-            "label": "4️⃣ Факап: реклама шла, лидов нет",
-            "url": "https://telegra.ph/4-post-2-razdel-10-20",
-        },
-        {
-            "label": "5️⃣ Кейс клиента: ROI ×4 без увеличения бюджета",
-            "url": "https://telegra.ph/5-post-2-razdel-10-20",
-        },
-        {
-            "label": "6️⃣ 3 сигнала, что подрядчик тратит твои деньги впустую",
-            "url": "https://telegra.ph/6-post-2-razdel-10-20",
-        },
-    ],
-    "3": [
-        {
-            "label": "1️⃣ Как не тратить 2 часа в день на отчёты",
-            "url": "https://telegra.ph/1-post-3-razdel-10-20",
-        },
-        {
-            "label": "2️⃣ Боты, которые экономят бюджет (и нервы)",
-            "url": "https://telegra.ph/2-post-3-razdel-10-20",
-        },
-        {
-            "label": "3️⃣ Telegram Ads + Google Sheets: простая сквозная аналитика",
-            "url": "https://telegra.ph/3-post-3-razdel-10-20",
-        },
-        {
-            "label": "4️⃣ Сценарий “воронки на автопилоте”",
-            "url": "https://telegra.ph/4-post-3-razdel-10-20",
-        },
-        {
-            "label": "5️⃣ Автоматизация лидогенерации через Ads + бот",
-            "url": "https://telegra.ph/5-post-3-razdel-10-20",
-        },
-        {
-            "label": "6️⃣ Инструменты для Telegram-маркетолога: must-have 2025",
-            "url": "https://telegra.ph/6-post-3-razdel-10-20",
-        },
-    ],
-}
-
-
-def guides_menu_keyboard():
+GUIDES_PREFIX = "guides:"
+GUIDES_MENU = "guides:menu"
+GUIDES_BACK = "guides:back"
+# Кнопки «назад» из сообщений, отправленных до перехода на каталог.
+_LEGACY_BACK_SUFFIX = "_back"
+
+GUIDES_MENU_TITLE = "Загляни в подборку материалов — выбери раздел 👇"
+
+
+def _build_guides_menu_keyboard(catalog: Catalog) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
-    builder.button(text="Раздел 1 · Основы Telegram Ads", callback_data=SECTION_BASICS)
-    builder.button(text="Раздел 2 · Ошибки и кейсы", callback_data=SECTION_CASES)
-    builder.button(text="Раздел 3 · Автоматизация", callback_data=SECTION_AUTOMATION)
-    builder.button(text="Назад в меню", callback_data=SECTION_BACK)
+    for section_id in catalog.order:
+        builder.button(text=catalog.sections[section_id].title, callback_data=f"{GUIDES_PREFIX}{section_id}")
+    builder.button(text="Назад в меню", callback_data=GUIDES_BACK)
     builder.adjust(1)
     return builder.as_markup()
 
 
-def _build_section_keyboard(section_id: str, back_callback: str):
+def _build_section_keyboard(section: GuideSection) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
-    for item in SECTION_ITEMS.get(section_id, []):
-        builder.button(text=item["label"], url=item["url"])
-    builder.button(text="Назад к разделам", callback_data=back_callback)
+    for item in section.items:
+        builder.button(text=item.label, url=item.url)
+    builder.button(text="Назад к разделам", callback_data=GUIDES_MENU)
     builder.adjust(1)
     return builder.as_markup()
 
 
-def basics_section_keyboard():
-    return _build_section_keyboard("1", SECTION_BASICS_BACK)
+# Клавиатуры собираются один раз на версию каталога, а не на каждый апдейт.
+_keyboards: Tuple[int, InlineKeyboardMarkup, Dict[str, InlineKeyboardMarkup]] = (0, InlineKeyboardMarkup(inline_keyboard=[]), {})
 
 
-def cases_section_keyboard():
-    return _build_section_keyboard("2", SECTION_CASES_BACK)
+def _catalog_keyboards() -> Tuple[Catalog, InlineKeyboardMarkup, Dict[str, InlineKeyboardMarkup]]:
+    global _keyboards
+    catalog = get_guides_catalog()
+    version, menu, sections = _keyboards
+    if version != catalog.version:
+        menu = _build_guides_menu_keyboard(catalog)
+        sections = {section_id: _build_section_keyboard(section) for section_id, section in catalog.sections.items()}
+        _keyboards = (catalog.version, menu, sections)
+    return catalog, menu, sections
 
 
-def automation_section_keyboard():
-    return _build_section_keyboard("3", SECTION_AUTOMATION_BACK)
+def _menu_title(catalog: Catalog) -> str:
+    return catalog.menu_title or GUIDES_MENU_TITLE
 
 
-@router.message(F.text == "📚 Гайды и материалы")
-async def handle_guides(message: Message) -> None:
-    await message.answer(
-        "Загляни в подборку материалов — выбери раздел 👇",
-        reply_markup=guides_menu_keyboard(),
-    )
+def guides_menu_keyboard() -> InlineKeyboardMarkup:
+    return _catalog_keyboards()[1]
 
 
-@router.callback_query(F.data == SECTION_BASICS)
-async def show_basics(callback: CallbackQuery) -> None:
-    await callback.answer()
-    await callback.message.answer(
-        "Раздел 1 · Основы Telegram Ads",
-        reply_markup=basics_section_keyboard(),
-    )
-
-
-@router.callback_query(F.data == SECTION_BASICS_BACK)
-async def back_to_guides(callback: CallbackQuery) -> None:
-    await callback.answer()
-    await callback.message.answer(
-        "Загляни в подборку материалов — выбери раздел 👇",
-        reply_markup=guides_menu_keyboard(),
-    )
+def section_keyboard(section_id: str) -> Optional[InlineKeyboardMarkup]:
+    return _catalog_keyboards()[2].get(section_id)
 
 
-@router.callback_query(F.data == SECTION_CASES)
-async def show_cases(callback: CallbackQuery) -> None:
-    await callback.answer()
-    await callback.message.answer(
-        "Раздел 2 · Ошибки и кейсы",
-        reply_markup=cases_section_keyboard(),
-    )
+async def _show(callback: CallbackQuery, text: str, reply_markup: InlineKeyboardMarkup) -> None:
+    """Переходы по каталогу меняют то же сообщение, а не присылают новое."""
+    if isinstance(callback.message, Message):
+        try:
+            await callback.message.edit_text(text, reply_markup=reply_markup)
+            return
+        except TelegramBadRequest as exc:
+            if "message is not modified" in str(exc):
+                return
+            # Сообщение слишком старое или без текста — отвечаем новым.
+    await callback.bot.send_message(callback.from_user.id, text, reply_markup=reply_markup)
 
 
-@router.callback_query(F.data == SECTION_CASES_BACK)
-async def back_to_guides_from_cases(callback: CallbackQuery) -> None:
-    await callback.answer()
-    await callback.message.answer(
-        "Загляни в подборку материалов — выбери раздел 👇",
-        reply_markup=guides_menu_keyboard(),
-    )
+@router.message(F.text == "📚 Гайды и материалы")
+async def handle_guides(message: Message) -> None:
+    catalog, menu, _ = _catalog_keyboards()
+    await message.answer(_menu_title(catalog), reply_markup=menu)
 
 
-@router.callback_query(F.data == SECTION_AUTOMATION)
-async def show_automation(callback: CallbackQuery) -> None:
+@router.callback_query(F.data == GUIDES_BACK)
+async def go_back(callback: CallbackQuery) -> None:
     await callback.answer()
     await callback.message.answer(
-        "Раздел 3 · Автоматизация",
-        reply_markup=automation_section_keyboard(),
+        "Возвращаю в главное меню, выбирай следующий шаг ⚡️",
+        reply_markup=main_menu_keyboard(),
     )
 
 
-@router.callback_query(F.data == SECTION_AUTOMATION_BACK)
-async def back_to_guides_from_automation(callback: CallbackQuery) -> None:
-    await callback.answer()
-    await callback.message.answer(
-        "Загляни в подборку материалов — выбери раздел 👇",
-        reply_markup=guides_menu_keyboard(),
-    )
+@router.callback_query(F.data.startswith(GUIDES_PREFIX))
+async def navigate_guides(callback: CallbackQuery) -> None:
+    catalog, menu, sections = _catalog_keyboards()
+    target = callback.data[len(GUIDES_PREFIX):]
+    section = catalog.sections.get(target)
 
+    if section is None:
+        unknown = target != GUIDES_MENU[len(GUIDES_PREFIX):] and not target.endswith(_LEGACY_BACK_SUFFIX)
+        await callback.answer("Этого раздела больше нет." if unknown else None)
+        await _show(callback, _menu_title(catalog), menu)
+        return
 
-@router.callback_query(F.data == SECTION_BACK)
-async def go_back(callback: CallbackQuery) -> None:
     await callback.answer()
-    await callback.message.answer(
-        "Возвращаю в главное меню, выбирай следующий шаг ⚡️",
-        reply_markup=main_menu_keyboard(),
-    )
+    await _show(callback, section.title, sections[section.section_id])
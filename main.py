@@ -1,32 +1,109 @@
 import asyncio
 import logging
+import secrets
+import signal
 from aiohttp import web
 from aiogram import Bot, Dispatcher
 from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
-from data.config import get_config
+from data.config import Config, get_config
+from data.broadcast_jobs import close_broadcast_jobs
+from data.follow_ups import close_follow_up_queue
+from data.local_storage import stop_audit_writer
+from data.fsm_storage import create_fsm_storage
+from data.storage import close_user_registry
 from handlers.admin import router as admin_router
 from handlers.audit import router as audit_router
 from handlers.contact import router as contact_router
 from handlers.guides import router as guides_router
 from handlers.site import router as site_router
 from handlers.start import router as start_router
+from utils.background import drain_background_tasks
+from utils.broadcast import resume_broadcasts
+from utils.metrics import setup_metrics
+from utils.notifications import stop_admin_notifier
+from utils.routing import setup_route_index
 from utils.scheduler import start_scheduler
 
 
-async def start_web_server():
-    """Фиктивный сервер для Render, чтобы он видел открытый порт."""
+def create_web_app() -> web.Application:
+    """Веб-приложение бота: health-check для Render, /metrics и, в режиме webhook, приём апдейтов."""
     async def handle(request):
         return web.Response(text="Bot is alive!")
 
     app = web.Application()
     app.add_routes([web.get("/", handle)])
+    return app
 
+
+async def start_web_server(app: web.Application, port: int) -> web.AppRunner:
     runner = web.AppRunner(app)
     await runner.setup()
-    site = web.TCPSite(runner, "0.0.0.0", 10000)
+    site = web.TCPSite(runner, "0.0.0.0", port)
     await site.start()
+    return runner
+
+
+async def wait_for_stop_signal() -> None:
+    """
+    Ждёт SIGTERM/SIGINT. Render при передеплое шлёт SIGTERM: без обработчика процесс
+    умирает сразу, и `finally` в main() не успевает дослать очереди и закрыть хранилища.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    installed = []
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows: обработчики сигналов у event loop не поддерживаются.
+            continue
+        installed.append(sig)
+    try:
+        await stop.wait()
+        logging.info("Stop signal received; shutting down.")
+    finally:
+        for sig in installed:
+            loop.remove_signal_handler(sig)
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, app: web.Application, config: Config) -> None:
+    """
+    Telegram сам присылает апдейты на WEBHOOK_BASE_URL + WEBHOOK_PATH.
+    Запрос проверяется по секретному токену, а обработка идёт в фоне,
+    чтобы Telegram сразу получал 200.
+    """
+    secret = config.webhook_secret or secrets.token_urlsafe(32)
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=True,
+        secret_token=secret,
+    ).register(app, path=config.webhook_path)
+    setup_application(app, dp, bot=bot)
+
+    runner = await start_web_server(app, config.web_server_port)
+    try:
+        await bot.set_webhook(
+            url=f"{config.webhook_base_url}{config.webhook_path}",
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        await wait_for_stop_signal()
+    finally:
+        await runner.cleanup()
+
+
+async def run_polling(dp: Dispatcher, bot: Bot, app: web.Application, config: Config) -> None:
+    runner = await start_web_server(app, config.web_server_port)
+    try:
+        # Оставшийся от webhook-режима вебхук не даст getUpdates работать.
+        await bot.delete_webhook()
+        await dp.start_polling(bot)
+    finally:
+        await runner.cleanup()
 
 
 async def main():
@@ -38,7 +115,7 @@ async def main():
         default=DefaultBotProperties(parse_mode=ParseMode.HTML)
     )
 
-    dp = Dispatcher()
+    dp = Dispatcher(storage=create_fsm_storage(config))
     start_scheduler(bot)
 
     dp.include_router(start_router)
@@ -47,12 +124,30 @@ async def main():
     dp.include_router(guides_router)
     dp.include_router(contact_router)
     dp.include_router(site_router)
+    routes = setup_route_index(dp, exclude=(admin_router,))
+    logging.info("Route index: %s", routes)
 
-    # Запускаем веб-сервер и polling параллельно
-    await asyncio.gather(
-        start_web_server(),
-        dp.start_polling(bot)
-    )
+    await resume_broadcasts(bot)
+
+    app = create_web_app()
+    setup_metrics(dp, bot, app)
+    use_webhook = config.bot_mode == "webhook"
+    if use_webhook and not config.webhook_base_url:
+        logging.warning("BOT_MODE=webhook but WEBHOOK_BASE_URL is empty; falling back to polling.")
+        use_webhook = False
+
+    try:
+        if use_webhook:
+            await run_webhook(dp, bot, app, config)
+        else:
+            await run_polling(dp, bot, app, config)
+    finally:
+        await drain_background_tasks()
+        await stop_audit_writer()
+        await stop_admin_notifier()
+        close_broadcast_jobs()
+        close_follow_up_queue()
+        close_user_registry()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Хранилища открываются при импорте модулей — уводим их во временный каталог
+# до того, как тесты что-либо импортируют.
+_ROOT = Path(__file__).resolve().parent.parent
+_STORAGE_DIR = Path(tempfile.mkdtemp(prefix="bot-tests-"))
+
+sys.path.insert(0, str(_ROOT))
+for name, file_name in (
+    ("AUDIT_JSON_PATH", "audits.json"),
+    ("AUDIT_DB_PATH", "audits.db"),
+    ("USERS_DB_PATH", "users.db"),
+    ("SCHEDULER_DB_PATH", "scheduler.db"),
+    ("FOLLOW_UP_DB_PATH", "follow_ups.db"),
+    ("FSM_DB_PATH", "fsm.db"),
+    ("AUDIT_ARCHIVE_DIR", "archive"),
+):
+    os.environ[name] = str(_STORAGE_DIR / file_name)
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+os.environ.setdefault("ADMIN_IDS", "1")
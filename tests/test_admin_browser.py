@@ -0,0 +1,26 @@
+from data.audit_query import AuditPage
+from handlers.admin import _render_page
+
+
+def _page(**fields):
+    record = {
+        "id": "a1",
+        "timestamp": "2026-01-02T03:04:05",
+        "username": "@user",
+        "audit_type": "Таргет",
+        "goal": "Заявки",
+        "link": "https://example.com",
+        "status": "open",
+    }
+    record.update(fields)
+    return AuditPage(records=[record], newest=1, oldest=1)
+
+
+def test_render_page_escapes_user_fields():
+    text, markup = _render_page({"status": "open"}, _page(link="https://x.io/?a<b&c=1", username="<b>Bob</b>"))
+
+    assert "https://x.io/?a&lt;b&amp;c=1" in text
+    assert "&lt;b&gt;Bob&lt;/b&gt;" in text
+    assert "<" not in text and "&c=" not in text
+    # В кнопке разметка не разбирается — там остаётся исходный ник.
+    assert markup.inline_keyboard[0][0].text.endswith("<b>Bob</b>")
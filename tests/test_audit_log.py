@@ -0,0 +1,107 @@
+import json
+import os
+
+from data.audit_log import AuditLog, read_audits
+
+
+def _insert(log, *keys):
+    log.write_batch([("insert", key, {"id": key, "link": f"https://example.com/{key}"}) for key in keys])
+
+
+def _keys(log):
+    return sorted(record["id"] for record in log.load())
+
+
+def _history(path, rounds=4, per_round=3):
+    """Несколько сжатий подряд: снапшот, копии .json.bakN и журналы .log.bakN."""
+    log = AuditLog(path, compact_min_entries=10_000)
+    keys = []
+    for round_number in range(rounds):
+        batch = [f"r{round_number}-{n}" for n in range(per_round)]
+        _insert(log, *batch)
+        keys.extend(batch)
+        log.compact()
+    _insert(log, "tail")
+    log.write_batch([("delete", keys[0], None)])
+    log.close()
+    return sorted([*keys[1:], "tail"])
+
+
+def test_snapshot_is_compact_json(tmp_path):
+    log = AuditLog(tmp_path / "audits.json")
+    _insert(log, "a")
+    log.compact()
+    log.close()
+
+    body = (tmp_path / "audits.json").read_text(encoding="utf-8")
+    assert "\n" not in body
+    assert json.loads(body)["entries"][0][0] == "a"
+
+
+def test_truncated_snapshot_is_restored_from_backup(tmp_path):
+    path = tmp_path / "audits.json"
+    expected = _history(path)
+    data = path.read_bytes()
+    path.write_bytes(data[: len(data) // 2])
+
+    log = AuditLog(path)
+    assert _keys(log) == expected
+    log.close()
+    assert list(tmp_path.glob("audits.json.corrupt-*"))
+    # Восстановленное состояние зафиксировано: повторное открытие его видит.
+    assert _keys(AuditLog(path)) == expected
+
+
+def test_restore_from_older_backup_replays_retired_journals(tmp_path):
+    path = tmp_path / "audits.json"
+    expected = _history(path)
+    for damaged in (path, path.with_suffix(".json.bak1"), path.with_suffix(".json.bak2")):
+        damaged.write_text("{broken", encoding="utf-8")
+
+    assert sorted(record["id"] for record in read_audits(path)) == expected
+    log = AuditLog(path)
+    assert _keys(log) == expected
+    log.close()
+
+
+def test_torn_journal_tail_is_trimmed(tmp_path):
+    path = tmp_path / "audits.json"
+    log = AuditLog(path)
+    _insert(log, "a", "b")
+    log.close()
+    with path.with_suffix(".log").open("a", encoding="utf-8") as journal:
+        journal.write('{"op":"put","key":"c","record":{"id":"c"')
+
+    log = AuditLog(path)
+    assert _keys(log) == ["a", "b"]
+    _insert(log, "d")
+    log.close()
+    assert _keys(AuditLog(path)) == ["a", "b", "d"]
+
+
+def test_interrupted_compaction_does_not_replay_old_entries(tmp_path):
+    path = tmp_path / "audits.json"
+    log = AuditLog(path)
+    _insert(log, "a")
+    log.compact()
+    _insert(log, "b")
+    log.write_batch([("delete", "a", None)])
+    log.close()
+    # Сжатие упало после переименования журнала, но до нового снапшота.
+    os.replace(path.with_suffix(".log"), path.with_suffix(".log.compacting"))
+
+    log = AuditLog(path)
+    assert _keys(log) == ["b"]
+    log.close()
+    assert not path.with_suffix(".log.compacting").exists()
+    assert _keys(AuditLog(path)) == ["b"]
+
+
+def test_legacy_list_snapshot_is_upgraded(tmp_path):
+    path = tmp_path / "audits.json"
+    path.write_text(json.dumps([{"id": "old", "link": "x"}, {"link": "no id"}]), encoding="utf-8")
+
+    log = AuditLog(path)
+    assert len(log.load()) == 2
+    log.close()
+    assert json.loads(path.read_text(encoding="utf-8"))["lsn"] == 0
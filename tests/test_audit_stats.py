@@ -0,0 +1,62 @@
+from data.audit_archive import AuditArchive
+from data.audit_stats import AuditStats
+from data.local_storage import _AuditCache
+
+
+def _record(number, status="resolved"):
+    return {
+        "id": f"a{number}",
+        "timestamp": "2026-01-02T10:00:00",
+        "resolved_at": "2026-01-02T10:30:00",
+        "status": status,
+        "audit_type": "Таргет",
+        "goal": "Заявки",
+    }
+
+
+class _Backend:
+    def __init__(self, records):
+        self._records = records
+
+    def signature(self):
+        return 1
+
+    def load(self):
+        return list(self._records)
+
+    def write_batch(self, writes):
+        pass
+
+
+def test_aggregates_are_recomputed_only_after_changes(monkeypatch):
+    cache = _AuditCache(_Backend([_record(1), _record(2, "open")]))
+    archived = AuditStats([_record(3)])
+    calls = []
+    original = AuditStats.snapshot
+
+    def counting_snapshot(self, days=7):
+        calls.append(days)
+        return original(self, days)
+
+    monkeypatch.setattr(AuditStats, "snapshot", counting_snapshot)
+
+    first = cache.aggregates(7, archived=archived)
+    assert cache.aggregates(7, archived=archived) == first
+    assert len(calls) == 1
+    assert first["total"] == 3 and first["resolved"] == 2
+
+    archived.add(_record(4))
+    assert cache.aggregates(7, archived=archived)["total"] == 4
+    assert len(calls) == 2
+
+
+def test_archive_stats_do_not_scan_segments_after_load(tmp_path, monkeypatch):
+    archive = AuditArchive(tmp_path)
+    archive.store([_record(1), _record(2)])
+
+    def no_disk():
+        raise AssertionError("segments listed on the read path")
+
+    monkeypatch.setattr(archive, "_disk_sizes", no_disk)
+    assert archive.stats().total == 2
+    assert archive.stats().total == 2
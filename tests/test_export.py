@@ -0,0 +1,43 @@
+import csv
+import json
+
+from utils import export
+
+
+_RECORD = {
+    "id": "a1",
+    "timestamp": "2026-01-02T03:04:05",
+    "status": "open",
+    "user_id": 42,
+    "username": "@evil",
+    "audit_type": "Таргет",
+    "goal": "+100 подписчиков",
+    "link": '=HYPERLINK("https://evil.example","click")',
+}
+
+
+def _export(monkeypatch, fmt):
+    monkeypatch.setattr(export, "iter_audits", lambda filters: iter([dict(_RECORD)]))
+    path, count = export.export_audits(fmt)
+    try:
+        return path.read_text(encoding="utf-8-sig"), count
+    finally:
+        path.unlink()
+
+
+def test_csv_neutralises_formula_cells(monkeypatch):
+    body, count = _export(monkeypatch, "csv")
+
+    (row,) = csv.DictReader(body.splitlines())
+    assert count == 1
+    assert row["link"] == "'" + _RECORD["link"]
+    assert row["username"] == "'@evil"
+    assert row["goal"] == "'+100 подписчиков"
+    assert row["audit_type"] == "Таргет"
+    assert row["user_id"] == "42"
+
+
+def test_jsonl_keeps_values_as_is(monkeypatch):
+    body, _ = _export(monkeypatch, "jsonl")
+
+    assert json.loads(body)["link"] == _RECORD["link"]
@@ -0,0 +1,36 @@
+import html
+
+from utils.notifications import _MESSAGE_LIMIT, _format_messages
+
+
+def _audit(number, link="https://example.com"):
+    return {"user": f"@user{number}", "audit_type": "Таргет", "goal": "Заявки", "link": link}
+
+
+def _length(text):
+    return len(html.unescape(text))
+
+
+def test_small_burst_is_one_digest():
+    messages = _format_messages([_audit(n) for n in range(5)])
+
+    assert len(messages) == 1
+    assert messages[0].startswith("🆕 Новых аудитов: 5")
+
+
+def test_single_audit_with_huge_link_fits():
+    (message,) = _format_messages([_audit(1, "https://x.io/" + "a" * 5000)])
+
+    assert _length(message) <= _MESSAGE_LIMIT
+    assert message.startswith("🆕 Новый аудит!")
+
+
+def test_digest_is_split_by_rendered_length():
+    audits = [_audit(n, "https://x.io/?q=" + "&" * 4096) for n in range(20)]
+
+    messages = _format_messages(audits)
+
+    assert len(messages) > 1
+    assert all(_length(message) <= _MESSAGE_LIMIT for message in messages)
+    delivered = "".join(messages)
+    assert all(f"@user{n} " in delivered or f"@user{n}\n" in delivered for n in range(20))
@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+from data.storage import UserRegistry
+
+
+def test_register_never_touches_sqlite_on_the_event_loop(tmp_path):
+    registry = UserRegistry(tmp_path / "users.db", batch_size=10)
+    loop_thread = threading.get_ident()
+    writer_threads = set()
+    connection = registry._connection
+
+    def tracked_connection():
+        writer_threads.add(threading.get_ident())
+        return connection()
+
+    registry._connection = tracked_connection
+
+    async def burst():
+        for user_id in range(1, 101):
+            registry.register(user_id, f"user{user_id}")
+            await asyncio.sleep(0)
+        # Дать пулу потоков дописать запланированные пачки.
+        await asyncio.sleep(0.2)
+
+    asyncio.run(burst())
+
+    assert writer_threads and loop_thread not in writer_threads
+    assert registry.count_active() == 100
+    registry.close()
+
+
+def test_failed_flush_keeps_pending_users(tmp_path):
+    registry = UserRegistry(tmp_path / "users.db", batch_size=1000)
+    registry.register(1, "first")
+
+    def broken():
+        raise RuntimeError("disk is gone")
+
+    connection, registry._connection = registry._connection, broken
+    try:
+        registry.flush()
+    except RuntimeError:
+        pass
+    registry._connection = connection
+
+    assert registry.count_active() == 1
+    registry.close()
@@ -0,0 +1,92 @@
+import logging
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Optional, Set, Type
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import StatesGroup
+from aiogram.types import CallbackQuery, Message, TelegramObject, User
+from dotenv import load_dotenv
+
+from data.config import get_config
+
+
+class AdminACL:
+    """
+    Список админов: множество user_id из ADMIN_IDS.
+
+    ADMIN_USERNAME остаётся запасным вариантом: совпавший по нику пользователь
+    один раз сверяется по строке, после чего его id попадает в множество и
+    дальше проверка — один поиск по set.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Set[int] = set()
+        self._usernames: FrozenSet[str] = frozenset()
+        self.reload()
+
+    def reload(self) -> None:
+        config = get_config()
+        usernames = (name.strip().lstrip("@").lower() for name in config.admin_username.split(","))
+        self._ids = set(config.admin_ids)
+        self._usernames = frozenset(name for name in usernames if name)
+        if not self._ids and not self._usernames:
+            logging.warning("Neither ADMIN_IDS nor ADMIN_USERNAME is configured; admin access is denied.")
+
+    @property
+    def ids(self) -> FrozenSet[int]:
+        return frozenset(self._ids)
+
+    def is_admin(self, user: Optional[User]) -> bool:
+        if user is None:
+            return False
+        if user.id in self._ids:
+            return True
+        if user.username and user.username.lower() in self._usernames:
+            logging.info("Admin @%s matched by username; add %s to ADMIN_IDS.", user.username, user.id)
+            self._ids.add(user.id)
+            return True
+        return False
+
+
+_acl = AdminACL()
+
+
+def is_admin(user: Optional[User]) -> bool:
+    return _acl.is_admin(user)
+
+
+def reload_admin_acl() -> FrozenSet[int]:
+    """Перечитывает .env и переменные окружения; возвращает известные id админов."""
+    load_dotenv(override=True)
+    _acl.reload()
+    return _acl.ids
+
+
+class AdminMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware админского маршрутизатора: срабатывает после того,
+    как фильтры выбрали обработчик, и не пускает к нему не-админов.
+    Застрявшее админское состояние (`states`) у такого пользователя сбрасывается.
+    """
+
+    def __init__(self, states: Optional[Type[StatesGroup]] = None) -> None:
+        self._states = states
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if _acl.is_admin(data.get("event_from_user")):
+            return await handler(event, data)
+
+        state: Optional[FSMContext] = data.get("state")
+        raw_state = data.get("raw_state")
+        if state is not None and self._states is not None and raw_state is not None and raw_state in self._states:
+            await state.clear()
+        if isinstance(event, CallbackQuery):
+            await event.answer("⛔ Нет доступа.", show_alert=True)
+        elif isinstance(event, Message):
+            await event.answer("⛔ Доступ запрещён.")
+        return None
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, List, Set
+
+
+# Ссылки на фоновые задачи: без них незавершённую задачу может собрать сборщик мусора.
+_tasks: Set[asyncio.Task] = set()
+
+
+def run_in_background(coro: Awaitable[None], name: str) -> asyncio.Task:
+    """
+    Запускает побочное действие, не задерживая ответ пользователю.
+
+    Ошибка задачи только логируется и не влияет ни на обработчик, ни на
+    соседние задачи. Незавершённые задачи дожидаются на остановке бота
+    через `drain_background_tasks`.
+    """
+
+    async def runner() -> None:
+        try:
+            await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # noqa: BLE001
+            logging.exception("Background task %s failed", name)
+
+    task = asyncio.create_task(runner(), name=name)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+def pending_background_tasks() -> int:
+    return len(_tasks)
+
+
+async def drain_background_tasks(timeout: float = 10.0) -> None:
+    """Ждёт фоновые задачи не дольше `timeout` секунд, оставшиеся отменяет."""
+    if not _tasks:
+        return
+    _, pending = await asyncio.wait(set(_tasks), timeout=timeout)
+    if pending:
+        logging.warning("Cancelling %s unfinished background tasks", len(pending))
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def collect_batch(queue: asyncio.Queue, window: float, max_batch: int) -> List[Any]:
+    """
+    Ждёт первый элемент очереди, затем ещё не дольше `window` секунд добирает
+    попутчиков — до `max_batch` штук. Основа группового коммита и сводок админу.
+    """
+    batch = [await queue.get()]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + window
+    while len(batch) < max_batch:
+        timeout = deadline - loop.time()
+        if timeout <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout))
+        except asyncio.TimeoutError:
+            break
+    return batch
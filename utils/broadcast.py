@@ -0,0 +1,332 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+
+from data.broadcast_jobs import (
+    BroadcastJob,
+    broadcast_job_counts,
+    create_broadcast_job,
+    finish_broadcast_job,
+    iter_pending_recipient_pages,
+    record_broadcast_results,
+    running_broadcast_jobs,
+    set_progress_message,
+)
+from data.config import get_config
+from data.storage import mark_user_blocked
+from utils.background import run_in_background
+
+
+# Ошибки BadRequest, после которых писать пользователю бессмысленно.
+_PERMANENT_BAD_REQUEST_MARKERS = (
+    "chat not found",
+    "user is deactivated",
+    "peer_id_invalid",
+    "bot was blocked",
+)
+
+
+class TokenBucket:
+    """
+    Ограничитель скорости «ведро с токенами».
+
+    `rate` токенов в секунду, не больше `capacity` подряд. `pause` опустошает
+    ведро и замораживает выдачу — так ответ Telegram «Retry after N»
+    притормаживает сразу всех отправителей, а не одного.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self._rate = rate
+        self._capacity = capacity if capacity is not None else rate
+        self._tokens = self._capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+    def pause(self, seconds: float) -> None:
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0
+        self._updated = now
+
+
+@dataclass
+class BroadcastResult:
+    sent: int = 0
+    failed: int = 0
+    blocked: int = 0
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed + self.blocked
+
+
+def _is_permanent(exc: Exception) -> bool:
+    if isinstance(exc, TelegramForbiddenError):
+        return True
+    if isinstance(exc, TelegramBadRequest):
+        message = str(exc).lower()
+        return any(marker in message for marker in _PERMANENT_BAD_REQUEST_MARKERS)
+    return False
+
+
+class BroadcastEngine:
+    """
+    Рассылка пулом параллельных отправителей под общим ограничителем скорости.
+
+    Получатели читаются из реестра страницами и идут через ограниченную очередь,
+    так что память не зависит от размера аудитории. Retry-After выполняется
+    для всех воркеров сразу, временные ошибки повторяются с паузой, а
+    заблокировавшие бота пользователи помечаются в реестре и не повторяются.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        rate_per_second: float,
+        concurrency: int,
+        max_attempts: int = 3,
+    ) -> None:
+        self._bot = bot
+        self._bucket = TokenBucket(rate_per_second)
+        self._concurrency = max(concurrency, 1)
+        self._max_attempts = max_attempts
+
+    async def run(
+        self,
+        text: str,
+        pages: Iterator[List[int]],
+        on_result: Optional[Callable[[int, str], Awaitable[None]]] = None,
+    ) -> BroadcastResult:
+        result = BroadcastResult()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._concurrency * 2)
+        workers = [
+            asyncio.create_task(self._worker(queue, text, result, on_result))
+            for _ in range(self._concurrency)
+        ]
+        try:
+            while True:
+                page: Optional[List[int]] = await asyncio.to_thread(next, pages, None)
+                if page is None:
+                    break
+                for user_id in page:
+                    await queue.put(user_id)
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return result
+
+    async def _worker(
+        self,
+        queue: asyncio.Queue,
+        text: str,
+        result: BroadcastResult,
+        on_result: Optional[Callable[[int, str], Awaitable[None]]],
+    ) -> None:
+        while True:
+            user_id = await queue.get()
+            try:
+                outcome = await self._deliver(user_id, text)
+                if outcome == "sent":
+                    result.sent += 1
+                elif outcome == "blocked":
+                    result.blocked += 1
+                else:
+                    result.failed += 1
+                if on_result is not None:
+                    await on_result(user_id, outcome)
+            except Exception:  # noqa: BLE001
+                logging.exception("Broadcast result handler failed for %s", user_id)
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, user_id: int, text: str) -> str:
+        attempt = 0
+        while True:
+            await self._bucket.acquire()
+            try:
+                await self._bot.send_message(user_id, text)
+                return "sent"
+            except TelegramRetryAfter as exc:
+                logging.warning("Broadcast throttled by Telegram, pausing for %ss", exc.retry_after)
+                self._bucket.pause(exc.retry_after)
+                continue
+            except Exception as exc:  # noqa: BLE001
+                if _is_permanent(exc):
+                    await asyncio.to_thread(mark_user_blocked, user_id)
+                    return "blocked"
+                attempt += 1
+                if attempt >= self._max_attempts or not isinstance(
+                    exc, (TelegramNetworkError, TelegramServerError)
+                ):
+                    logging.exception("Failed to send broadcast to %s", user_id)
+                    return "failed"
+                await asyncio.sleep(2 ** attempt)
+
+
+def create_broadcast_engine(bot: Bot) -> BroadcastEngine:
+    config = get_config()
+    return BroadcastEngine(
+        bot,
+        rate_per_second=max(config.broadcast_rate_per_second, 1),
+        concurrency=config.broadcast_concurrency,
+    )
+
+
+class _BroadcastProgress:
+    """Живой отчёт о рассылке: одно сообщение, которое правится не чаще раза в `interval` секунд."""
+
+    def __init__(self, bot: Bot, job: BroadcastJob, done: BroadcastResult, interval: float = 3.0) -> None:
+        self._bot = bot
+        self._job = job
+        self._done = done
+        self._interval = interval
+        self._started = time.monotonic()
+        self._processed_at_start = done.processed
+        self._last_edit = 0.0
+        self._last_text = ""
+
+    def add(self, outcome: str) -> None:
+        if outcome == "sent":
+            self._done.sent += 1
+        elif outcome == "blocked":
+            self._done.blocked += 1
+        else:
+            self._done.failed += 1
+
+    def render(self, finished: bool = False) -> str:
+        done = self._done
+        remaining = max(self._job.total - done.processed, 0)
+        elapsed = max(time.monotonic() - self._started, 1e-6)
+        throughput = (done.processed - self._processed_at_start) / elapsed
+        header = "✅ Рассылка завершена" if finished else "📢 Рассылка идёт"
+        lines = [
+            f"{header} (#{self._job.job_id})",
+            f"Отправлено: {done.sent} / {self._job.total}",
+            f"🚫 Заблокировали бота: {done.blocked}",
+            f"⚠️ Ошибок: {done.failed}",
+        ]
+        if not finished:
+            eta = f"{remaining / throughput:.0f} с" if throughput > 0 else "—"
+            lines.append(f"Осталось: {remaining} · {throughput:.1f} сообщ./с · ETA {eta}")
+        return "\n".join(lines)
+
+    async def publish(self, force: bool = False, finished: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_edit < self._interval:
+            return
+        self._last_edit = now
+        text = self.render(finished)
+        if text == self._last_text:
+            return
+        self._last_text = text
+
+        if self._job.progress_message_id is None:
+            try:
+                message = await self._bot.send_message(self._job.chat_id, text)
+            except Exception as exc:  # noqa: BLE001
+                logging.warning("Failed to send broadcast progress: %s", exc)
+                return
+            self._job.progress_message_id = message.message_id
+            await asyncio.to_thread(set_progress_message, self._job.job_id, message.message_id)
+            return
+        try:
+            await self._bot.edit_message_text(
+                text=text,
+                chat_id=self._job.chat_id,
+                message_id=self._job.progress_message_id,
+            )
+        except TelegramBadRequest as exc:
+            if "message is not modified" not in str(exc):
+                logging.warning("Failed to update broadcast progress: %s", exc)
+        except Exception as exc:  # noqa: BLE001
+            logging.warning("Failed to update broadcast progress: %s", exc)
+
+
+async def _run_job(bot: Bot, job: BroadcastJob, flush_every: int = 50, flush_interval: float = 1.0) -> None:
+    counts = await asyncio.to_thread(broadcast_job_counts, job.job_id)
+    done = BroadcastResult(
+        sent=counts.get("sent", 0),
+        failed=counts.get("failed", 0),
+        blocked=counts.get("blocked", 0),
+    )
+    progress = _BroadcastProgress(bot, job, done)
+    pending: List[Tuple[int, str]] = []
+    last_flush = time.monotonic()
+
+    async def on_result(user_id: int, outcome: str) -> None:
+        nonlocal pending, last_flush
+        progress.add(outcome)
+        pending.append((user_id, outcome))
+        if len(pending) >= flush_every or time.monotonic() - last_flush >= flush_interval:
+            batch, pending = pending, []
+            last_flush = time.monotonic()
+            await asyncio.to_thread(record_broadcast_results, job.job_id, batch)
+        await progress.publish()
+
+    await progress.publish(force=True)
+    engine = create_broadcast_engine(bot)
+    try:
+        await engine.run(job.text, iter_pending_recipient_pages(job.job_id), on_result)
+    finally:
+        # Синхронно: при отмене на остановке бота await может уже не выполниться.
+        record_broadcast_results(job.job_id, pending)
+        pending = []
+
+    await asyncio.to_thread(finish_broadcast_job, job.job_id)
+    await progress.publish(force=True, finished=True)
+
+
+def _spawn(bot: Bot, job: BroadcastJob) -> None:
+    # Общий реестр фоновых задач: на остановке бота рассылку дожидаются или отменяют,
+    # а несброшенные статусы получателей успевают записаться.
+    run_in_background(_run_job(bot, job), name=f"broadcast:{job.job_id}")
+
+
+async def start_broadcast(bot: Bot, text: str, chat_id: int) -> BroadcastJob:
+    """Сохраняет задание рассылки и запускает его в фоне. Прогресс придёт в `chat_id`."""
+    job = await asyncio.to_thread(create_broadcast_job, text, chat_id)
+    if job.total:
+        _spawn(bot, job)
+    else:
+        await asyncio.to_thread(finish_broadcast_job, job.job_id)
+    return job
+
+
+async def resume_broadcasts(bot: Bot) -> int:
+    """Возобновляет незавершённые рассылки после перезапуска."""
+    jobs = await asyncio.to_thread(running_broadcast_jobs)
+    for job in jobs:
+        logging.info("Resuming broadcast job %s", job.job_id)
+        _spawn(bot, job)
+    return len(jobs)
@@ -0,0 +1,60 @@
+import csv
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Mapping, Tuple
+
+from data.audit_query import NO_FILTER, AuditFilter
+from data.local_storage import iter_audits
+
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_COLUMNS = ("id", "timestamp", "status", "resolved_at", "user_id", "username", "audit_type", "goal", "link")
+
+# С этих символов Excel начинает формулу: ссылка вида `=HYPERLINK(...)` из заявки
+# выполнилась бы у админа при открытии выгрузки.
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_row(record: Mapping[str, Any]) -> Dict[str, Any]:
+    row = {}
+    for column in EXPORT_COLUMNS:
+        value = record.get(column)
+        if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+            value = "'" + value
+        row[column] = value
+    return row
+
+
+def export_audits(fmt: str, filters: AuditFilter = NO_FILTER) -> Tuple[Path, int]:
+    """
+    Выгружает заявки по фильтру во временный файл и возвращает (путь, число заявок).
+
+    Заявки читаются из хранилища постранично и сразу пишутся в файл, поэтому
+    память не зависит от размера истории. Файл удаляет вызывающий.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    fd, name = tempfile.mkstemp(prefix="audits-", suffix=f".{fmt}")
+    path = Path(name)
+    count = 0
+    try:
+        # utf-8-sig: Excel иначе открывает кириллицу в CSV кракозябрами.
+        encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as file:
+            if fmt == "csv":
+                writer = csv.DictWriter(file, fieldnames=EXPORT_COLUMNS)
+                writer.writeheader()
+                for record in iter_audits(filters):
+                    writer.writerow(_csv_row(record))
+                    count += 1
+            else:
+                for record in iter_audits(filters):
+                    file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    count += 1
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return path, count
@@ -1,8 +1,9 @@
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
 
 
-def main_menu_keyboard() -> ReplyKeyboardMarkup:
-    """Return a reply keyboard with the main navigation buttons."""
+# Разметка aiogram — неизменяемые pydantic-модели, поэтому клавиатуры собираются
+# один раз при импорте и один и тот же объект отдаётся во все ответы.
+def _build_main_menu_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text="🔍 Бесплатный аудит")],
@@ -15,7 +16,7 @@ def main_menu_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-def contact_keyboard() -> InlineKeyboardMarkup:
+def _build_contact_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [
@@ -26,3 +27,16 @@ def contact_keyboard() -> InlineKeyboardMarkup:
             ]
         ]
     )
+
+
+_MAIN_MENU_KEYBOARD = _build_main_menu_keyboard()
+_CONTACT_KEYBOARD = _build_contact_keyboard()
+
+
+def main_menu_keyboard() -> ReplyKeyboardMarkup:
+    """Return a reply keyboard with the main navigation buttons."""
+    return _MAIN_MENU_KEYBOARD
+
+
+def contact_keyboard() -> InlineKeyboardMarkup:
+    return _CONTACT_KEYBOARD
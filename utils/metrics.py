@@ -0,0 +1,378 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from aiogram.types import TelegramObject, Update
+from aiohttp import web
+
+from data.broadcast_jobs import pending_broadcast_recipients
+from data.config import get_config
+from data.local_storage import audit_writer_pending, get_cache_stats, get_storage_timings
+from utils.background import pending_background_tasks
+from utils.notifications import admin_notifications_pending
+from utils.scheduler import get_follow_up_metrics
+
+
+LabelValues = Tuple[str, ...]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы гистограмм в секундах: от миллисекунды (фильтры, кэш) до десятков секунд (Bot API под нагрузкой).
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: Any) -> None:
+        """Итог, который накапливает кто-то другой, — например, диспетчер follow-up."""
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._buckets = tuple(sorted(buckets))
+        # Метка -> [счётчики по корзинам (не накопительные), сумма, количество].
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = [[0] * (len(self._buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self._buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, hits in zip((*self._buckets, float("inf")), counts):
+                cumulative += hits
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Summary(_Metric):
+    """Готовые пары (количество, сумма), которые считает кто-то другой — например, хранилище."""
+
+    kind = "summary"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, Tuple[int, float]] = {}
+
+    def set_totals(self, count: int, total: float, **labels: Any) -> None:
+        self._values[self._key(labels)] = (count, total)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, (count, total) in sorted(self._values.items()):
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+Collector = Callable[[], Awaitable[None]]
+MetricT = TypeVar("MetricT", bound=_Metric)
+
+
+class MetricsRegistry:
+    """
+    Метрики процесса в текстовом формате Prometheus.
+
+    Счётчики и гистограммы обновляются на горячем пути (всё в одном event loop,
+    без блокировок). Глубины очередей и сводки хранилища снимаются коллекторами
+    только в момент запроса /metrics.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: MetricT) -> MetricT:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    async def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                await collector()
+            except Exception:  # noqa: BLE001
+                logging.exception("Metrics collector %s failed", getattr(collector, "__name__", collector))
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+UPDATES = registry.register(Counter("bot_updates_total", "Processed updates.", ("type", "handled")))
+UPDATE_SECONDS = registry.register(
+    Histogram("bot_update_duration_seconds", "Time to process one update, end to end.", ("type",))
+)
+HANDLER_SECONDS = registry.register(
+    Histogram("bot_handler_duration_seconds", "Handler latency including inner middlewares.", ("handler",))
+)
+HANDLER_ERRORS = registry.register(Counter("bot_handler_errors_total", "Exceptions raised by handlers.", ("handler",)))
+API_SECONDS = registry.register(Histogram("bot_api_request_duration_seconds", "Bot API call latency.", ("method",)))
+API_ERRORS = registry.register(Counter("bot_api_errors_total", "Failed Bot API calls.", ("method", "error")))
+LOOP_LAG = registry.register(Gauge("bot_event_loop_lag_seconds", "Last measured event-loop scheduling lag."))
+LOOP_LAG_SECONDS = registry.register(
+    Histogram(
+        "bot_event_loop_lag_distribution_seconds",
+        "Event-loop scheduling lag.",
+        buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+    )
+)
+QUEUE_DEPTH = registry.register(Gauge("bot_queue_depth", "Items waiting in internal queues.", ("queue",)))
+FOLLOW_UP_LAG = registry.register(Gauge("bot_follow_up_lag_seconds", "Age of the oldest due follow-up."))
+FOLLOW_UPS = registry.register(Counter("bot_follow_ups_total", "Dispatched follow-ups.", ("outcome",)))
+FOLLOW_UP_BATCH = registry.register(Gauge("bot_follow_up_last_batch", "Follow-ups sent by the last dispatch run."))
+FOLLOW_UP_DISPATCH_LAG = registry.register(
+    Gauge("bot_follow_up_dispatch_lag_seconds", "How late the last dispatched follow-up was sent.")
+)
+STORAGE_SECONDS = registry.register(
+    Summary("bot_audit_storage_duration_seconds", "Audit storage operations.", ("operation",))
+)
+AUDIT_CACHE = registry.register(Gauge("bot_audit_cache", "Audit cache hits, misses and size.", ("stat",)))
+
+
+def _handler_name(handler: Optional[HandlerObject]) -> str:
+    callback = getattr(handler, "callback", None)
+    if callback is None:
+        return "unknown"
+    module = getattr(callback, "__module__", "") or ""
+    return f"{module.rsplit('.', 1)[-1]}.{getattr(callback, '__qualname__', repr(callback))}"
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """Внешний middleware на `dp.update`: поток апдейтов и полное время обработки."""
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        started = time.perf_counter()
+        result = UNHANDLED
+        try:
+            result = await handler(event, data)
+            return result
+        finally:
+            UPDATE_SECONDS.observe(time.perf_counter() - started, type=update_type)
+            UPDATES.inc(type=update_type, handled="false" if result is UNHANDLED else "true")
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware на наблюдателях `dp`: aiogram применяет его к обработчикам
+    всех вложенных маршрутизаторов (и на быстром пути индекса маршрутов).
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        name = _handler_name(data.get("handler"))
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            HANDLER_ERRORS.inc(handler=name)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=name)
+
+
+class BotApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время и ошибки каждого вызова Bot API по методам."""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        name = getattr(method, "__api_method__", type(method).__name__)
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as exc:
+            API_ERRORS.inc(method=name, error=type(exc).__name__)
+            raise
+        finally:
+            API_SECONDS.observe(time.perf_counter() - started, method=name)
+
+
+class LoopLagMonitor:
+    """Раз в `interval` секунд засыпает и меряет, насколько позже положенного проснулся."""
+
+    def __init__(self, interval: float = 0.5) -> None:
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self._interval)
+            lag = max(loop.time() - started - self._interval, 0.0)
+            LOOP_LAG.set(lag)
+            LOOP_LAG_SECONDS.observe(lag)
+
+
+def _collect_storage() -> Tuple[Dict[str, Tuple[int, float]], Dict[str, int], int, Dict[str, float]]:
+    return get_storage_timings(), get_cache_stats(), pending_broadcast_recipients(), get_follow_up_metrics()
+
+
+async def _collect_state() -> None:
+    QUEUE_DEPTH.set(audit_writer_pending(), queue="audit_writer")
+    QUEUE_DEPTH.set(admin_notifications_pending(), queue="admin_notifications")
+    QUEUE_DEPTH.set(pending_background_tasks(), queue="background_tasks")
+
+    # SQLite и файлы — в поток, чтобы сбор метрик не тормозил апдейты.
+    timings, cache, broadcast_pending, follow_ups = await asyncio.to_thread(_collect_storage)
+    for operation, (count, total) in timings.items():
+        STORAGE_SECONDS.set_totals(count, total, operation=operation)
+    for stat, value in cache.items():
+        AUDIT_CACHE.set(value, stat=stat)
+    QUEUE_DEPTH.set(broadcast_pending, queue="broadcast_recipients")
+    QUEUE_DEPTH.set(follow_ups.get("depth", 0), queue="follow_ups")
+    QUEUE_DEPTH.set(follow_ups.get("due", 0), queue="follow_ups_due")
+    FOLLOW_UP_LAG.set(follow_ups.get("lag_seconds", 0.0))
+    FOLLOW_UPS.set_total(follow_ups.get("sent", 0), outcome="sent")
+    FOLLOW_UPS.set_total(follow_ups.get("dropped", 0), outcome="dropped")
+    FOLLOW_UP_BATCH.set(follow_ups.get("last_batch", 0))
+    FOLLOW_UP_DISPATCH_LAG.set(follow_ups.get("last_lag_seconds", 0.0))
+
+
+registry.add_collector(_collect_state)
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    token = get_config().metrics_token
+    if token and request.headers.get("Authorization") != f"Bearer {token}" and request.query.get("token") != token:
+        raise web.HTTPUnauthorized()
+    body = (await registry.render()).encode("utf-8")
+    return web.Response(body=body, headers={"Content-Type": CONTENT_TYPE})
+
+
+def setup_metrics(dp: Dispatcher, bot: Bot, app: web.Application, path: str = "/metrics") -> None:
+    """
+    Подключает сбор метрик к диспетчеру, сессии бота и веб-приложению.
+    Вызывается до запуска веб-сервера: монитор задержки цикла стартует вместе с ним.
+    """
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    handler_metrics = HandlerMetricsMiddleware()
+    for update_type in dp.resolve_used_update_types():
+        dp.observers[update_type].middleware(handler_metrics)
+    bot.session.middleware(BotApiMetricsMiddleware())
+
+    monitor = LoopLagMonitor()
+
+    async def on_startup(_: web.Application) -> None:
+        monitor.start()
+
+    async def on_cleanup(_: web.Application) -> None:
+        await monitor.stop()
+
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.add_routes([web.get(path, handle_metrics)])
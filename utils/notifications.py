@@ -1,33 +1,176 @@
+import asyncio
+import html
 import logging
-from typing import Dict
+from collections import defaultdict
+from typing import Dict, List, Optional, Union
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
 
+from utils.background import collect_batch
 
-async def notify_admin(bot: Bot, admin_username: str, audit_data: Dict[str, str]) -> None:
+
+ChatId = Union[int, str]
+
+# Telegram не принимает сообщения длиннее 4096 символов (после разбора HTML),
+# а ссылка из заявки сама может быть такой длины.
+_MESSAGE_LIMIT = 4096
+_FIELD_LIMIT = 256
+_LINK_LIMIT = 1024
+
+
+def _field(audit_data: Dict[str, str], key: str, default: str = "—") -> str:
+    # У бота parse_mode=HTML по умолчанию: один `<` или `&` от пользователя иначе
+    # превращает всё сообщение (а в сводке — до 20 заявок) в TelegramBadRequest.
+    value = str(audit_data.get(key) or default)
+    limit = _LINK_LIMIT if key == "link" else _FIELD_LIMIT
+    if len(value) > limit:
+        value = value[: limit - 1] + "…"
+    return html.escape(value)
+
+
+def _rendered_length(text: str) -> int:
+    return len(html.unescape(text))
+
+
+def _format_single(audit_data: Dict[str, str]) -> str:
+    return (
+        "🆕 Новый аудит!\n"
+        f"Пользователь: {_field(audit_data, 'user', 'Неизвестно')}\n"
+        f"Тип: {_field(audit_data, 'audit_type')}\n"
+        f"Цель: {_field(audit_data, 'goal')}\n"
+        f"Ссылка: {_field(audit_data, 'link')}"
+    )
+
+
+def _format_digest(items: List[Dict[str, str]]) -> str:
+    lines = [f"🆕 Новых аудитов: {len(items)}"]
+    for number, audit_data in enumerate(items, start=1):
+        lines.append(
+            f"{number}. {_field(audit_data, 'user', 'Неизвестно')} — "
+            f"{_field(audit_data, 'audit_type')} / {_field(audit_data, 'goal')}\n"
+            f"   {_field(audit_data, 'link')}"
+        )
+    return "\n\n".join(lines)
+
+
+def _format_messages(items: List[Dict[str, str]]) -> List[str]:
+    """Заявки одного чата: сводки, пока влезают в лимит Telegram, а одна заявка — отдельным сообщением."""
+    chunks: List[List[Dict[str, str]]] = []
+    for audit_data in items:
+        if chunks and _rendered_length(_format_digest([*chunks[-1], audit_data])) <= _MESSAGE_LIMIT:
+            chunks[-1].append(audit_data)
+        else:
+            chunks.append([audit_data])
+    return [_format_single(chunk[0]) if len(chunk) == 1 else _format_digest(chunk) for chunk in chunks]
+
+
+class AdminNotifier:
+    """
+    Фоновая доставка уведомлений админу.
+
+    Приём заявки только кладёт уведомление в очередь. Воркер ждёт
+    `coalesce_window` секунд, собирает всё, что успело прийти, и при всплеске
+    отправляет одно сводное сообщение вместо десятка. Временные ошибки
+    повторяются с экспоненциальной паузой, Retry-After соблюдается.
     """
-    Отправляет админу сообщение о новой заявке.
+
+    def __init__(
+        self,
+        bot: Bot,
+        coalesce_window: float = 2.0,
+        max_batch: int = 20,
+        max_attempts: int = 5,
+    ) -> None:
+        self._bot = bot
+        self._coalesce_window = coalesce_window
+        self._max_batch = max_batch
+        self._max_attempts = max_attempts
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def enqueue(self, chat_id: ChatId, audit_data: Dict[str, str]) -> None:
+        self.start()
+        self._queue.put_nowait((chat_id, dict(audit_data)))
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дожидается отправки очереди (не дольше `timeout`) и останавливает воркер."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning("Admin notifications left undelivered: %s", self._queue.qsize())
+        self._worker.cancel()
+        await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+
+    async def _run(self) -> None:
+        while True:
+            batch = await collect_batch(self._queue, self._coalesce_window, self._max_batch)
+            try:
+                by_chat: Dict[ChatId, List[Dict[str, str]]] = defaultdict(list)
+                for chat_id, audit_data in batch:
+                    by_chat[chat_id].append(audit_data)
+                for chat_id, items in by_chat.items():
+                    for text in _format_messages(items):
+                        await self._deliver(chat_id, text)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, chat_id: ChatId, text: str) -> None:
+        for attempt in range(1, self._max_attempts + 1):
+            try:
+                await self._bot.send_message(chat_id=chat_id, text=text)
+                return
+            except TelegramRetryAfter as exc:
+                await asyncio.sleep(exc.retry_after)
+            except (TelegramBadRequest, TelegramForbiddenError) as exc:
+                logging.error("Admin notification rejected by Telegram: %s", exc)
+                break
+            except Exception as exc:  # noqa: BLE001
+                logging.warning("Admin notification attempt %s failed: %s", attempt, exc)
+                await asyncio.sleep(min(2 ** attempt, 60))
+
+        logging.error("Failed to notify admin about new audits:\n%s", text)
+
+
+_notifier: Optional[AdminNotifier] = None
+
+
+def notify_admin(bot: Bot, admin_chat: ChatId, audit_data: Dict[str, str]) -> None:
+    """
+    Ставит в очередь сообщение админу о новой заявке и сразу возвращает управление.
     Формат:
     🆕 Новый аудит!
     Пользователь: @username
     Тип: Telegram Ads
     Цель: Подписчики
     Ссылка: ...
+    Несколько заявок подряд приходят одним сводным сообщением.
     """
-    if not admin_username:
-        logging.warning("Admin username is empty; cannot send notification.")
+    global _notifier
+    if not admin_chat:
+        logging.warning("Admin chat is empty; cannot send notification.")
         return
+    if _notifier is None:
+        _notifier = AdminNotifier(bot)
+    _notifier.enqueue(admin_chat, audit_data)
+
+
+def admin_notifications_pending() -> int:
+    return _notifier.pending if _notifier is not None else 0
 
-    message_text = (
-        "🆕 Новый аудит!\n"
-        f"Пользователь: {audit_data.get('user', 'Неизвестно')}\n"
-        f"Тип: {audit_data.get('audit_type', '—')}\n"
-        f"Цель: {audit_data.get('goal', '—')}\n"
-        f"Ссылка: {audit_data.get('link', '—')}"
-    )
 
-    try:
-        await bot.send_message(chat_id=admin_username, text=message_text)
-    except Exception as exc:  # noqa: BLE001
-        logging.exception("Failed to notify admin about new audit: %s", exc)
-        print(f"[ADMIN NOTICE - FALLBACK]\n{message_text}")
+async def stop_admin_notifier(timeout: float = 10.0) -> None:
+    if _notifier is not None:
+        await _notifier.stop(timeout)
@@ -0,0 +1,220 @@
+import operator
+from typing import Any, Awaitable, Callable, Dict, Iterable, NamedTuple, Optional, Set, Tuple
+
+from aiogram import BaseMiddleware, Dispatcher, Router
+from aiogram.dispatcher.event.bases import SkipHandler
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.dispatcher.middlewares.manager import MiddlewareManager
+from aiogram.filters import Command, StateFilter
+from aiogram.fsm.state import State
+from aiogram.types import TelegramObject
+from magic_filter.operations import CallOperation, ComparatorOperation, GetAttributeOperation
+
+
+# Какое поле события индексируется для каждого типа апдейта.
+_INDEXED_FIELDS = {"message": "text", "callback_query": "data"}
+
+
+class Route(NamedTuple):
+    router: Router
+    observer: TelegramEventObserver
+    handler: HandlerObject
+
+
+class RouteIndex:
+    """
+    Точные значения и префиксы поля события -> обработчик.
+
+    Значение с `None` вместо маршрута зарезервировано: его обрабатывает
+    маршрутизатор, который нельзя обходить (например, админский), и такие
+    события всегда идут по обычной цепочке фильтров.
+    """
+
+    def __init__(self) -> None:
+        self.exact: Dict[str, Optional[Route]] = {}
+        # Порядок вставки — порядок регистрации, то есть приоритет.
+        self.prefixes: Dict[str, Optional[Route]] = {}
+
+    def __len__(self) -> int:
+        return sum(route is not None for route in (*self.exact.values(), *self.prefixes.values()))
+
+    def _covered_by_prefix(self, value: str) -> bool:
+        return any(value.startswith(prefix) for prefix in self.prefixes)
+
+    def add_exact(self, value: str, route: Optional[Route]) -> None:
+        # Раньше зарегистрированный обработчик выигрывает, как и в обычной цепочке.
+        if value not in self.exact and not self._covered_by_prefix(value):
+            self.exact[value] = route
+
+    def add_prefix(self, prefix: str, route: Optional[Route]) -> None:
+        if not self._covered_by_prefix(prefix):
+            self.prefixes[prefix] = route
+
+    def lookup(self, value: Any) -> Optional[Route]:
+        if not isinstance(value, str):
+            return None
+        if value in self.exact:
+            return self.exact[value]
+        for prefix, route in self.prefixes.items():
+            if value.startswith(prefix):
+                return route
+        return None
+
+
+def _matches_empty_state(state: Any) -> bool:
+    if isinstance(state, State):
+        state = state.state
+    return state is None or state == "*"
+
+
+def _classify(handler: HandlerObject, field: str) -> Tuple[str, Any]:
+    """
+    Что можно сказать об обработчике при пустом состоянии FSM:
+    `never` — не сработает, `command` — сработает только на команду,
+    `exact`/`prefix` — сработает ровно на это значение поля, `opaque` — неизвестно.
+    """
+    indexed: Optional[Tuple[str, str]] = None
+    commands: Set[str] = set()
+
+    for filter_object in handler.filters or ():
+        callback = filter_object.callback
+        if isinstance(callback, (State, StateFilter)):
+            states = (callback,) if isinstance(callback, State) else callback.states
+            if not any(_matches_empty_state(state) for state in states):
+                return "never", None
+            continue
+        if isinstance(callback, Command):
+            commands.update(callback.prefix)
+            continue
+
+        magic = getattr(filter_object, "magic", None)
+        operations = getattr(magic, "_operations", ())
+        if indexed is not None or not operations:
+            return "opaque", None
+        first = operations[0]
+        if not isinstance(first, GetAttributeOperation) or first.name != field:
+            return "opaque", None
+        if (
+            len(operations) == 2
+            and isinstance(operations[1], ComparatorOperation)
+            and operations[1].comparator is operator.eq
+            and isinstance(operations[1].right, str)
+        ):
+            indexed = ("exact", operations[1].right)
+        elif (
+            len(operations) == 3
+            and isinstance(operations[1], GetAttributeOperation)
+            and operations[1].name == "startswith"
+            and isinstance(operations[2], CallOperation)
+            and len(operations[2].args) == 1
+            and isinstance(operations[2].args[0], str)
+            and not operations[2].kwargs
+        ):
+            indexed = ("prefix", operations[2].args[0])
+        else:
+            return "opaque", None
+
+    if commands:
+        return ("command", commands) if indexed is None else ("opaque", None)
+    return indexed or ("opaque", None)
+
+
+def _bypassable(router: Router, update_type: str, root: Router) -> bool:
+    """Обход цепочки не должен пропустить ни внешних middleware, ни корневых фильтров."""
+    while router is not None and router is not root:
+        observer = router.observers[update_type]
+        # Корневые фильтры observer.filter(...) aiogram хранит в служебном обработчике.
+        if observer._handler.filters or list(observer.outer_middleware):
+            return False
+        router = router.parent_router
+    return True
+
+
+def build_route_index(dp: Dispatcher, update_type: str, exclude: Iterable[Router] = ()) -> RouteIndex:
+    """
+    Проходит обработчики в порядке диспетчеризации и индексирует те,
+    что срабатывают на точное значение поля или его префикс.
+
+    Индексирование останавливается на первом обработчике, про который нельзя
+    доказать, что он не перехватит событие раньше проиндексированного.
+    """
+    field = _INDEXED_FIELDS[update_type]
+    excluded = set(exclude)
+    index = RouteIndex()
+    command_prefixes: Set[str] = set()
+
+    for router in dp.chain_tail:
+        observer = router.observers[update_type]
+        indexable = router not in excluded and _bypassable(router, update_type, dp)
+
+        for handler in observer.handlers:
+            kind, value = _classify(handler, field)
+            if kind == "never":
+                continue
+            if kind == "command":
+                command_prefixes.update(value)
+                continue
+            if kind == "opaque":
+                return index
+            route = Route(router, observer, handler) if indexable else None
+            # Значения, которые могла перехватить команда выше, всегда идут по цепочке.
+            if value[:1] in command_prefixes or (not value and command_prefixes):
+                route = None
+            if kind == "exact":
+                index.add_exact(value, route)
+            else:
+                index.add_prefix(value, route)
+    return index
+
+
+class RouteIndexMiddleware(BaseMiddleware):
+    """
+    Быстрый путь перед цепочкой фильтров: кнопка меню или callback_data
+    находятся в индексе за O(1), и обработчик вызывается сразу.
+
+    Работает только при пустом состоянии FSM — посреди сценария текст
+    разбирают обработчики состояний. Внутренние middleware маршрутизатора
+    (и его родителей) вызываются как обычно.
+    """
+
+    def __init__(self, index: RouteIndex, field: str) -> None:
+        self._index = index
+        self._field = field
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        if data.get("raw_state") is not None:
+            return await handler(event, data)
+        route = self._index.lookup(getattr(event, self._field, None))
+        if route is None:
+            return await handler(event, data)
+
+        kwargs = {**data, "event_router": route.router, "handler": route.handler}
+        # Та же обёртка, что в TelegramEventObserver.trigger.
+        wrapped = MiddlewareManager.wrap_middlewares(route.observer._resolve_middlewares(), route.handler.call)
+        try:
+            return await wrapped(event, kwargs)
+        except SkipHandler:
+            return await handler(event, data)
+
+
+def setup_route_index(dp: Dispatcher, exclude: Iterable[Router] = ()) -> Dict[str, int]:
+    """
+    Подключает быстрый путь к `dp` после того, как все маршрутизаторы добавлены.
+    Внешние middleware, подключённые к `dp` позже, на быстром пути не вызываются.
+    Обработчики из `exclude` (админка) никогда не вызываются в обход цепочки.
+    Возвращает число проиндексированных маршрутов по типам апдейтов.
+    """
+    exclude = tuple(exclude)
+    sizes = {}
+    for update_type, field in _INDEXED_FIELDS.items():
+        index = build_route_index(dp, update_type, exclude)
+        sizes[update_type] = len(index)
+        if len(index):
+            dp.observers[update_type].outer_middleware(RouteIndexMiddleware(index, field))
+    return sizes
@@ -1,44 +1,160 @@
+import asyncio
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional
 
 from aiogram import Bot
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 from data.config import get_config
+from data.follow_ups import (
+    ack_follow_ups,
+    drop_stale_follow_ups,
+    due_follow_ups,
+    enqueue_follow_up,
+    follow_up_queue_stats,
+)
+from data.local_storage import archive_resolved_audits
+from utils.broadcast import TokenBucket
 
 
-scheduler = AsyncIOScheduler()
+FOLLOW_UP_JOB_PREFIX = "follow-up:"
+_DISPATCH_JOB_ID = "follow-ups:dispatch"
+_ARCHIVE_JOB_ID = "audits:archive"
+
+_config = get_config()
+scheduler = AsyncIOScheduler(
+    jobstores={"default": SQLAlchemyJobStore(url=f"sqlite:///{_config.scheduler_db_path}")},
+    job_defaults={"coalesce": True, "misfire_grace_time": 3600},
+)
+
+# Задания в SQLite хранятся в pickle, а Bot не сериализуется —
+# поэтому задания не получают бота аргументом, а берут его отсюда.
+_bot: Optional[Bot] = None
+_follow_up_bucket = TokenBucket(max(_config.follow_up_rate_per_second, 1))
+_dispatch_metrics: Dict[str, float] = {"sent": 0, "dropped": 0, "last_batch": 0, "last_lag_seconds": 0.0}
+
+
+def _migrate_follow_up_jobs() -> None:
+    """Переносит follow-up, запланированные отдельными заданиями, в общую очередь."""
+    now = time.time()
+    for job in scheduler.get_jobs():
+        if not job.id.startswith(FOLLOW_UP_JOB_PREFIX) or job.next_run_time is None:
+            continue
+        user_id, username = job.args
+        enqueue_follow_up(user_id, username, job.next_run_time.timestamp(), now)
+        job.remove()
 
 
 def start_scheduler(bot: Bot) -> None:
     """Ensure that the background scheduler is running."""
-    if not scheduler.running:
-        scheduler.start()
+    global _bot
+    _bot = bot
+    if scheduler.running:
+        return
+
+    scheduler.start(paused=True)
+    _migrate_follow_up_jobs()
+    scheduler.add_job(
+        dispatch_due_follow_ups,
+        trigger="interval",
+        seconds=max(get_config().follow_up_dispatch_interval_seconds, 1),
+        id=_DISPATCH_JOB_ID,
+        replace_existing=True,
+        max_instances=1,
+    )
+    scheduler.add_job(
+        archive_audits_job,
+        trigger="interval",
+        minutes=max(get_config().audit_archive_interval_minutes, 1),
+        id=_ARCHIVE_JOB_ID,
+        replace_existing=True,
+        max_instances=1,
+        # Первый проход сразу: добирает заявки, которые прошлый запуск не успел убрать.
+        next_run_time=datetime.now(),
+    )
+    scheduler.resume()
 
 
 async def schedule_follow_up(bot: Bot, user_id: int, username: Optional[str]) -> None:
     """
     Планирует сообщение пользователю через указанное количество часов после аудита.
+    Повторная заявка того же пользователя переносит уже запланированное сообщение.
     """
     start_scheduler(bot)
 
     config = get_config()
     delay_hours = max(config.follow_up_delay_hours, 1)
-    run_time = datetime.now() + timedelta(hours=delay_hours)
+    now = time.time()
 
     try:
-        scheduler.add_job(
-            send_follow_up,
-            trigger="date",
-            run_date=run_time,
-            args=[bot, user_id, username],
-            misfire_grace_time=3600,
-        )
+        await asyncio.to_thread(enqueue_follow_up, user_id, username, now + delay_hours * 3600, now)
     except Exception as exc:  # noqa: BLE001
         logging.exception("Failed to schedule follow-up message: %s", exc)
 
 
+async def dispatch_due_follow_ups() -> None:
+    """
+    Периодическое задание: отправляет одну пачку созревших follow-up.
+
+    Пачка ограничена FOLLOW_UP_BATCH_SIZE, отправка — FOLLOW_UP_RATE_PER_SECOND,
+    так что даже после долгого простоя очередь разгребается равномерно.
+    Просроченные дольше FOLLOW_UP_MAX_LATENESS_HOURS сообщения отбрасываются.
+    """
+    if _bot is None:
+        return
+
+    config = get_config()
+    now = time.time()
+    max_lateness = max(config.follow_up_max_lateness_hours, 1) * 3600
+
+    dropped = await asyncio.to_thread(drop_stale_follow_ups, now - max_lateness)
+    batch = await asyncio.to_thread(due_follow_ups, now, max(config.follow_up_batch_size, 1))
+
+    async def deliver(user_id: int, username: Optional[str]) -> None:
+        await _follow_up_bucket.acquire()
+        await send_follow_up(_bot, user_id, username)
+
+    await asyncio.gather(*(deliver(user_id, username) for user_id, username, _ in batch))
+    await asyncio.to_thread(ack_follow_ups, [(user_id, due_at) for user_id, _, due_at in batch])
+
+    _dispatch_metrics["sent"] += len(batch)
+    _dispatch_metrics["dropped"] += dropped
+    _dispatch_metrics["last_batch"] = len(batch)
+    _dispatch_metrics["last_lag_seconds"] = max((now - due_at for _, _, due_at in batch), default=0.0)
+    if dropped:
+        logging.info("Dropped %s stale follow-ups.", dropped)
+
+
+async def archive_audits_job() -> None:
+    """Периодическое задание: уносит давно разобранные заявки в сжатый архив."""
+    try:
+        archived = await archive_resolved_audits(timedelta(days=max(get_config().audit_archive_after_days, 0)))
+    except Exception as exc:  # noqa: BLE001
+        logging.exception("Failed to archive resolved audits: %s", exc)
+        return
+    if archived:
+        logging.info("Archived %s resolved audits.", archived)
+
+
+def get_follow_up_metrics() -> Dict[str, float]:
+    """Глубина очереди follow-up и отставание отправки — для мониторинга."""
+    metrics = dict(_dispatch_metrics)
+    metrics.update(follow_up_queue_stats(time.time()))
+    return metrics
+
+
+async def send_follow_up_job(user_id: int, username: Optional[str]) -> None:
+    # Оставлено для заданий, сохранённых до появления очереди: их переносит
+    # _migrate_follow_up_jobs, но восстановить их без этой функции APScheduler не сможет.
+    if _bot is None:
+        logging.error("Scheduler has no bot instance; skipping follow-up for %s", user_id)
+        return
+    await send_follow_up(_bot, user_id, username)
+
+
 async def send_follow_up(bot: Bot, user_id: int, username: Optional[str]) -> None:
     text = (
         f"Хей 👋 {username or ''}\n"